@@ -3,10 +3,17 @@
 查询并返回DataFrame格式
 """
 
-from .client import EMStockClient, search_emxg
+from .client import EMStockClient, search_emxg, AsyncEMStockClient, asearch_emxg, search_many
+from .cache import ResponseCache, set_default_cache, set_default_robot_cache
 from .data_adapter import DataFrame
+from .delta import Delta, DeltaTracker
+from .device_info import set_token_pool
 from .emfinger import get_printfinger
-from .wencai_client import WencaiStockClient, search_wencai
+from .export import export_pages, export_frame
+from .fastjson import set_json_decoder
+from .ratelimit import RateLimiter, FileRateLimiter, set_rate_limiter
+from .transport import TransportConfig, set_transport_config
+from .wencai_client import WencaiStockClient, search_wencai, search_wencai_many, AsyncWencaiStockClient, asearch_wencai
 
 
 __version__ = "2.2.6"
@@ -19,4 +26,4 @@ def search(keyword: str, max_count: int = None, max_page: int = None) -> DataFra
     return search_emxg(keyword, max_count=max_count, max_page=max_page)
 
 
-__all__ = ["EMStockClient", "search_emxg", "get_printfinger", "DataFrame", "add_column", "WencaiStockClient", "search_wencai", "search"]
+__all__ = ["EMStockClient", "search_emxg", "AsyncEMStockClient", "asearch_emxg", "search_many", "ResponseCache", "set_default_cache", "set_default_robot_cache", "RateLimiter", "FileRateLimiter", "set_rate_limiter", "TransportConfig", "set_transport_config", "get_printfinger", "set_token_pool", "export_pages", "export_frame", "set_json_decoder", "DataFrame", "Delta", "DeltaTracker", "add_column", "WencaiStockClient", "search_wencai", "search_wencai_many", "AsyncWencaiStockClient", "asearch_wencai", "search"]
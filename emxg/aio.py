@@ -0,0 +1,65 @@
+"""
+异步客户端公用的aiohttp会话管理
+"""
+
+import asyncio
+from typing import Any, Callable, TypeVar
+from weakref import WeakKeyDictionary
+
+
+T = TypeVar('T')
+
+
+class AsyncSessionClient:
+    """
+    按需创建aiohttp会话的异步客户端基类
+
+    同一个客户端实例内的所有请求共享一个连接池，支持 async with 自动关闭自动创建的会话
+    """
+
+    def _init_session(self, session: Any, limit: int, timeout: float) -> None:
+        """
+        Args:
+            session: 外部传入的aiohttp.ClientSession，None表示首次请求时自动创建
+            limit: 自动创建连接池时的最大连接数
+            timeout: 单次请求超时时间（秒）
+        """
+        self.session = session
+        self.limit = limit
+        self.timeout = timeout
+        self._owns_session = session is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _get_session(self) -> Any:
+        """获取aiohttp会话，不存在时创建"""
+        if self.session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError("请安装 aiohttp 库以支持异步查询: pip install aiohttp")
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._owns_session = True
+        return self.session
+
+    async def close(self) -> None:
+        """关闭自动创建的会话"""
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+
+def loop_local(clients: 'WeakKeyDictionary[asyncio.AbstractEventLoop, T]', factory: Callable[[], T]) -> T:
+    """返回当前事件循环缓存的客户端实例，不存在时创建；aiohttp会话不能跨事件循环使用"""
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None:
+        client = clients[loop] = factory()
+    return client
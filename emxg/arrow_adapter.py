@@ -0,0 +1,136 @@
+"""
+基于 pyarrow 的数据处理实现
+直接由分页数据构建 pyarrow.Table，数值解析使用 pyarrow.compute 计算内核
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .data_adapter import BOOL_TRUE_VALUES, CATEGORY_RATIO, NUMBER_PATTERN
+
+
+DataFrame = pa.Table
+
+
+def _build_column(values: List[Any]) -> pa.Array:
+    """构建列数组，混合类型的列统一保存为字符串"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def create_frame(data: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> DataFrame:
+    """由字典列表按列构建pyarrow.Table"""
+    names = columns if columns is not None else list(dict.fromkeys(key for row in data for key in row))
+    return pa.table({name: _build_column([row.get(name) for row in data]) for name in names})
+
+
+def rename_columns(df: DataFrame, mapping: Dict[str, str]) -> DataFrame:
+    """按映射重命名列"""
+    return df.rename_columns([mapping.get(name, name) for name in df.column_names])
+
+
+def concat(dfs: List[DataFrame], ignore_index=True) -> DataFrame:
+    """连接多个Table，缺失的列补空值"""
+    return pa.concat_tables(dfs, promote_options="default")
+
+
+def column_names(df: DataFrame) -> List[str]:
+    """返回列名列表"""
+    return list(df.column_names)
+
+
+def head(df: DataFrame, n: int) -> DataFrame:
+    """返回前n行"""
+    return df.slice(0, n)
+
+
+def to_records(df: DataFrame) -> List[Dict[str, Any]]:
+    """转换为字典列表"""
+    return df.to_pylist()
+
+
+def iter_tuples(df: DataFrame) -> Iterator[Tuple[Any, ...]]:
+    """逐行产出值元组，顺序同column_names"""
+    for batch in df.to_batches():
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def _is_numeric(column: pa.ChunkedArray) -> bool:
+    return pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_decimal(column.type)
+
+
+def convert_number_column(column: pa.ChunkedArray, strip: str = '') -> pa.ChunkedArray:
+    """转换数值列为float64，支持"亿"/"万"单位，无法解析的值为空值"""
+    if _is_numeric(column) or pa.types.is_null(column.type):
+        return pc.cast(column, pa.float64())
+    if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+        return column
+
+    text = pc.utf8_trim_whitespace(column)
+    if strip:
+        text = pc.utf8_trim_whitespace(pc.replace_substring(text, strip, ''))
+    has_yi = pc.match_substring(text, '亿')
+    has_wan = pc.match_substring(text, '万')
+    digits = pc.if_else(has_yi, pc.replace_substring(text, '亿', ''),
+                        pc.if_else(has_wan, pc.replace_substring(text, '万', ''), text))
+    valid = pc.match_substring_regex(digits, NUMBER_PATTERN)
+    numbers = pc.cast(pc.if_else(valid, digits, pa.scalar(None, digits.type)), pa.float64())
+    scale = pc.if_else(has_yi, 100000000.0, pc.if_else(has_wan, 10000.0, 1.0))
+    return pc.multiply(numbers, scale)
+
+
+def convert_percent_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """转换百分比列为小数，保留4位"""
+    number = convert_number_column(column, strip='%')
+    if not pa.types.is_floating(number.type):
+        return number
+    # .5时远离零舍入，与内置round对常见百分比的结果一致
+    return pc.round(pc.divide(number, 100.0), 4, round_mode='half_towards_infinity')
+
+
+def convert_bool_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """转换布尔列"""
+    try:
+        text = pc.utf8_trim_whitespace(pc.cast(column, pa.string()))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.chunked_array([pa.array([False] * len(column))])
+    return pc.fill_null(pc.is_in(text, value_set=pa.array(BOOL_TRUE_VALUES)), False)
+
+
+def convert_columns(df: DataFrame, conversions: List[Tuple[str, str]], processor: Any = None) -> DataFrame:
+    """使用计算内核按列转换数据类型，conversions为(列名, 转换类型)列表，类型为number/percent/bool"""
+    for col_name, kind in conversions:
+        index = df.column_names.index(col_name)
+        column = df.column(index)
+        if kind == 'number':
+            column = convert_number_column(column)
+        elif kind == 'percent':
+            column = convert_percent_column(column)
+        elif kind == 'bool':
+            column = convert_bool_column(column)
+        df = df.set_column(index, col_name, column)
+    return df
+
+
+def compact_frame(df: DataFrame, downcast: bool = False) -> Tuple[DataFrame, Dict[str, Tuple[int, int]]]:
+    """
+    压缩列存储，返回压缩后的Table和各列压缩前后的内存占用(字节)
+
+    低基数的字符串列使用字典编码，downcast为True时float64降为float32
+    """
+    report = {}
+    for index, name in enumerate(df.column_names):
+        column = df.column(index)
+        before = column.nbytes
+        if downcast and pa.types.is_float64(column.type):
+            column = pc.cast(column, pa.float32())
+        elif (pa.types.is_string(column.type) and len(column)
+              and pc.count_distinct(column, mode='all').as_py() <= len(column) * CATEGORY_RATIO):
+            column = column.dictionary_encode()
+        df = df.set_column(index, name, column)
+        report[name] = (before, column.nbytes)
+    return df, report
@@ -0,0 +1,106 @@
+"""
+多关键词批量查询
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from traceback import format_exc
+
+
+logger = logging.getLogger(__package__)
+
+# 设置单个关键词超时时检查进度的间隔（秒）
+POLL_INTERVAL = 0.1
+
+
+def _row_count(result: Any) -> int:
+    """返回查询结果的行数，非表格结果记为0"""
+    try:
+        return len(result) if result is not None else 0
+    except TypeError:
+        return 0
+
+
+def run_batch(search: Callable[[str], Any],
+              keywords: Iterable[str],
+              concurrency: int = 4,
+              timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    使用有界线程池并发执行多个关键词查询
+
+    单个关键词失败或超时只记录在报告中，不影响其他关键词。超时的查询不会被强制中断，
+    但批量调用不再等待其结果；所有线程都被超时的查询占用时，仍在排队的关键词直接记为超时。
+
+    Args:
+        search: 单个关键词的查询函数，失败时抛出异常
+        keywords: 关键词列表，重复的关键词只查询一次
+        concurrency: 最大并发查询数
+        timeout: 单个关键词从开始执行起的超时时间（秒），None表示不限制
+
+    Returns:
+        Tuple[Dict, Dict]: (关键词到查询结果的字典，失败或超时为None；
+        关键词到报告的字典，包含status(ok/error/timeout)、rows、elapsed、error)
+    """
+    keywords = list(dict.fromkeys(keywords))
+    results: Dict[str, Any] = {}
+    report: Dict[str, Dict[str, Any]] = {}
+    if not keywords:
+        return results, report
+
+    started: Dict[str, float] = {}
+
+    def run(keyword: str) -> Tuple[Any, Dict[str, Any]]:
+        started[keyword] = time.monotonic()
+        try:
+            result = search(keyword)
+        except Exception as e:
+            logger.warning(f"关键词[{keyword}]查询失败: {str(e)}")
+            logger.debug(format_exc())
+            return None, {"status": "error", "rows": 0,
+                          "elapsed": time.monotonic() - started[keyword], "error": str(e)}
+        return result, {"status": "ok", "rows": _row_count(result),
+                        "elapsed": time.monotonic() - started[keyword], "error": None}
+
+    workers = max(1, min(concurrency, len(keywords)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(run, keyword): keyword for keyword in keywords}
+    pending = set(futures)
+    # 已超时但仍占用线程的查询
+    abandoned = set()
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=POLL_INTERVAL if timeout else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                keyword = futures[future]
+                results[keyword], report[keyword] = future.result()
+
+            if timeout:
+                now = time.monotonic()
+                for future in list(pending):
+                    keyword = futures[future]
+                    if keyword in started and now - started[keyword] > timeout:
+                        pending.discard(future)
+                        abandoned.add(future)
+                        logger.warning(f"关键词[{keyword}]查询超时")
+                        report[keyword] = {"status": "timeout", "rows": 0,
+                                           "elapsed": now - started[keyword], "error": "timeout"}
+
+                # 所有线程都被超时的查询占用时，排队中的关键词无法开始，同样记为超时
+                abandoned = {future for future in abandoned if not future.done()}
+                if len(abandoned) >= workers:
+                    for future in list(pending):
+                        keyword = futures[future]
+                        if keyword not in started and future.cancel():
+                            pending.discard(future)
+                            logger.warning(f"关键词[{keyword}]无空闲线程，未执行")
+                            report[keyword] = {"status": "timeout", "rows": 0, "elapsed": 0.0,
+                                               "error": "timeout: no free worker"}
+    finally:
+        executor.shutdown(wait=False)
+
+    logger.info(f"批量查询完成，成功{sum(r['status'] == 'ok' for r in report.values())}/{len(keywords)}个关键词")
+
+    return {keyword: results.get(keyword) for keyword in keywords}, {keyword: report[keyword] for keyword in keywords}
@@ -0,0 +1,180 @@
+"""
+查询结果持久化缓存
+基于SQLite实现，支持TTL过期和按容量的LRU淘汰，可在多线程和多进程间共享
+"""
+
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Optional
+
+from .data_adapter import BACKEND
+
+
+logger = logging.getLogger(__package__)
+
+# 交易所所在时区（UTC+8）
+CN_TZ = timezone(timedelta(hours=8))
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "emxg", "responses.sqlite")
+
+
+def trading_session(now: Optional[datetime] = None) -> str:
+    """
+    返回当前所处的交易时段标识，如"2026-10-16:am"
+
+    时段分为 pre(开盘前)、am(上午)、noon(午休)、pm(下午)、post(收盘后)，
+    时段切换后缓存键随之变化，避免跨时段使用旧数据
+    """
+    now = (now or datetime.now(CN_TZ)).astimezone(CN_TZ)
+    hm = now.hour * 100 + now.minute
+    if hm < 930:
+        phase = "pre"
+    elif hm < 1130:
+        phase = "am"
+    elif hm < 1300:
+        phase = "noon"
+    elif hm < 1500:
+        phase = "pm"
+    else:
+        phase = "post"
+    return f"{now:%Y-%m-%d}:{phase}"
+
+
+class ResponseCache:
+    """SQLite查询结果缓存"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 60, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite数据库文件路径，None表示使用 ~/.cache/emxg/responses.sqlite
+            ttl: 缓存有效期（秒）
+            max_bytes: 缓存总容量上限（字节），超出时按最近访问时间淘汰
+        """
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """每次操作使用独立连接并在事务结束后关闭，保证线程和进程安全"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def make_key(self, provider: str, keyword: str, **params: Any) -> str:
+        """
+        根据数据源、关键词、分页参数、数据处理后端和交易时段生成缓存键
+
+        缓存中保存的是后端的DataFrame，不同后端的进程共用缓存文件时互不读取对方的结果
+        """
+        return json.dumps([provider, keyword, BACKEND, trading_session(), sorted(params.items())],
+                          ensure_ascii=False, default=str)
+
+    def get(self, key: str) -> Any:
+        """读取未过期的缓存，不存在或已过期返回None"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM responses WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"读取缓存失败: {str(e)}")
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            # 如缓存由其他版本或未安装的库写入，视为未命中
+            logger.warning(f"缓存数据无法解析，视为未命中: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """写入缓存并淘汰过期或超出容量的条目"""
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob), now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"写入缓存失败: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """删除过期条目，并按最近访问时间淘汰直到总容量不超过上限"""
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug(f"缓存淘汰{len(evicted)}条")
+
+    def delete(self, key: str) -> None:
+        """删除缓存条目"""
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"删除缓存失败: {str(e)}")
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_robot_cache: Optional[ResponseCache] = None
+
+
+def set_default_cache(cache: Optional[ResponseCache]) -> None:
+    """设置客户端默认使用的缓存，None表示关闭"""
+    global _default_cache
+    _default_cache = cache
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """获取客户端默认使用的缓存"""
+    return _default_cache
+
+
+def set_default_robot_cache(cache: Optional[ResponseCache]) -> None:
+    """设置i问财客户端默认使用的查询条件缓存，None表示关闭"""
+    global _default_robot_cache
+    _default_robot_cache = cache
+
+
+def get_default_robot_cache() -> Optional[ResponseCache]:
+    """获取i问财客户端默认使用的查询条件缓存"""
+    return _default_robot_cache
@@ -2,30 +2,37 @@
 东方财富条件选股查询
 """
 
+import asyncio
 import logging
 import string
 import random
 import time
-import requests
-from typing import Optional, Union, List, Dict, Any
+from typing import Optional, Union, List, Dict, Any, Iterable, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from traceback import format_exc
+from weakref import WeakKeyDictionary
 
-from .data_adapter import DataProcessor, DataFrame
+from .aio import AsyncSessionClient, loop_local
+from .batch import run_batch
+from .cache import ResponseCache, get_default_cache
+from .data_adapter import DataProcessor, DataFrame, concat, to_records
+from .delta import Delta, DeltaTracker
 from .emfinger import get_printfinger
+from .fastjson import loads
+from .planner import EM_PAGE_SIZE, plan_pages
+from .ratelimit import throttle, athrottle
+from .singleflight import SingleFlight
+from .transport import TransportConfig, get_transport_config
 
 
 logger = logging.getLogger(__package__)
 
+EM_SEARCH_URL = "https://np-tjxg-b.eastmoney.com/api/smart-tag/stock/v3/pw/search-code"
 
-class EMStockClient:
-    """东方财富条件选股查询客户端"""
 
-    def __init__(self):
-        self.base_url = "https://np-tjxg-b.eastmoney.com/api/smart-tag/stock/v3/pw/search-code"
-        self.session = requests.Session()
-        self.data_processor = DataProcessor()
-        self.fingerprint = get_printfinger()
+class EMRequestMixin:
+    """同步和异步客户端共用的请求构建和结果校验，使用方需提供fingerprint属性"""
 
     def _generate_request_id(self, length: int = 32) -> str:
         """生成请求ID"""
@@ -34,11 +41,185 @@ class EMStockClient:
         timestamp = str(int(time.time() * 1000000))  # 微秒时间戳
         return rand_str + timestamp
 
+    def _build_request_data(self, keyword: str, page_size: int, page_no: int, xc_id: str) -> Dict[str, Any]:
+        """构建请求数据"""
+        return {
+            "keyWord": keyword,
+            "pageSize": page_size,
+            "pageNo": page_no,
+            "fingerprint": self.fingerprint,
+            "gids": [],
+            "matchWord": "",
+            "timestamp": str(int(time.time() * 1000000)),
+            "shareToGuba": False,
+            "requestId": self._generate_request_id(),
+            "needCorrect": True,
+            "removedConditionIdList": [],
+            "xcId": xc_id,
+            "ownSelectAll": False,
+            "dxInfo": [],
+            "extraCondition": ""
+        }
+
+    def _extract_result(self, data: Dict[str, Any], page_no: int) -> Optional[Dict[str, Any]]:
+        """校验接口返回并提取result，非首页返回错误时视为没有更多数据，返回None"""
+        if data.get("code") != "100":
+            if page_no == 1:  # 第一页就失败，抛出异常
+                raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
+            return None  # 后续页面失败，可能是没有更多数据了
+        return data.get("data", {}).get("result", {})
+
+
+class EMStockClient(EMRequestMixin):
+    """东方财富条件选股查询客户端"""
+
+    def __init__(self, cache: Optional[ResponseCache] = None, transport: Optional[TransportConfig] = None):
+        """
+        Args:
+            cache: 查询结果缓存，None表示使用get_default_cache()返回的默认缓存
+            transport: 传输层配置，None表示使用get_transport_config()返回的默认配置
+        """
+        self.base_url = EM_SEARCH_URL
+        self.session = (transport or get_transport_config()).create_session()
+        self.data_processor = DataProcessor()
+        self.fingerprint = get_printfinger()
+        self.cache = cache
+        self._single_flight = SingleFlight()
+        self._delta_trackers: Dict[Tuple[str, str], DeltaTracker] = {}
+
+    def _fetch_page(self, keyword: str, page_size: int, page_no: int, xc_id: str) -> Optional[Dict[str, Any]]:
+        """获取单页数据，返回接口result字段"""
+        throttle("emxg")
+        response = self.session.post(
+            self.base_url,
+            json=self._build_request_data(keyword, page_size, page_no, xc_id),
+            timeout=30
+        )
+        response.raise_for_status()
+        return self._extract_result(loads(response.content), page_no)
+
+    def _iter_pages_concurrently(self, keyword: str, page_size: int, xc_id: str,
+                                 first_page: int, last_page: int, concurrency: int) -> Iterator[List[Dict[str, Any]]]:
+        """并发获取[first_page, last_page]范围内的页面，按页码顺序产出，遇到失败页或空页时停止"""
+        page_nos = list(range(first_page, last_page + 1))
+        if not page_nos:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(page_nos)))
+        futures = [executor.submit(self._fetch_page, keyword, page_size, no, xc_id) for no in page_nos]
+        try:
+            for page_no, future in zip(page_nos, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"第{page_no}页处理失败，停止获取: {str(e)}")
+                    return
+
+                data_list = result.get("dataList", []) if result else []
+                if not data_list:
+                    return
+
+                logger.debug(f"已获取第{page_no}页数据，本页{len(data_list)}条")
+                yield data_list
+
+                if len(data_list) < page_size:
+                    return
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _iter_raw_pages(self,
+                        keyword: str,
+                        page_size: int,
+                        max_count: Optional[int] = None,
+                        max_page: Optional[int] = None,
+                        concurrency: int = 1,
+                        prefetch: bool = False) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """
+        按页码顺序逐页获取原始数据，产出(columns, data_list)
+
+        首页失败时抛出异常，后续页面失败时停止获取；受max_count限制时最后一页已截断
+        """
+        plan = plan_pages(max_count, max_page, page_size)
+        page_size = plan.page_size
+        count = 0
+        page_no = 1
+        xc_id = ""  # 首次请求为空
+        prefetcher = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+
+        try:
+            while True:
+                try:
+                    if next_page is not None:
+                        result = next_page.result()
+                        next_page = None
+                    else:
+                        result = self._fetch_page(keyword, page_size, page_no, xc_id)
+                except Exception as e:
+                    if page_no == 1:
+                        raise Exception(f"查询失败: {str(e)}")
+                    logger.warning(f"第{page_no}页处理失败，停止获取: {str(e)}")
+                    return
+
+                if result is None:
+                    return
+
+                # 解析数据
+                columns = result.get("columns", [])
+                data_list = result.get("dataList", [])
+                total = result.get("total", 0)
+
+                # 更新xcId用于下次请求
+                if "xcId" in result:
+                    xc_id = result["xcId"]
+
+                if not data_list:
+                    return
+
+                full_page = len(data_list) >= page_size
+                if plan.limit is not None:
+                    data_list = data_list[:plan.remaining(count)]
+                count += len(data_list)
+
+                logger.debug(f"已获取第{page_no}页数据，本页{len(data_list)}条，累计{count}条")
+
+                # 检查是否达到计划的条数或页数，或者没有更多数据
+                if (plan.remaining(count) == 0 or (plan.page_count and page_no >= plan.page_count)
+                        or not full_page or count >= total):
+                    yield columns, data_list
+                    return
+
+                # 已知总数，并发获取剩余页面
+                if concurrency > 1:
+                    yield columns, data_list
+                    for data_list in self._iter_pages_concurrently(
+                            keyword, page_size, xc_id, page_no + 1, plan.pages_for_total(total), concurrency):
+                        if plan.limit is not None:
+                            data_list = data_list[:plan.remaining(count)]
+                        count += len(data_list)
+                        yield columns, data_list
+                        if plan.remaining(count) == 0:
+                            return
+                    return
+
+                page_no += 1
+                # 调用方处理当前页时预先获取下一页
+                if prefetcher is not None:
+                    next_page = prefetcher.submit(self._fetch_page, keyword, page_size, page_no, xc_id)
+                yield columns, data_list
+        finally:
+            if prefetcher is not None:
+                prefetcher.shutdown(wait=False)
+
     def search(self,
                keyword: str = "今日涨停",
                page_size: int = 50,
                max_count: Optional[int] = None,
-               max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
+               max_page: Optional[int] = None,
+               concurrency: int = 1,
+               pipeline: bool = False) -> Union[DataFrame, List[Dict[str, Any]]]:
         """
         搜索股票数据
 
@@ -47,77 +228,260 @@ class EMStockClient:
             page_size: 每页数量，默认50
             max_count: 最大返回数据条数，None表示不限制
             max_page: 最大页数，None表示不限制
+            concurrency: 并发请求数，大于1时在获取首页得到总数后并发获取剩余页面
+            pipeline: 是否逐页转换，转换当前页时预先获取下一页，最后合并各页结果
 
         Returns:
             Union[DataFrame, List[Dict]]: 股票数据，有pandas返回DataFrame，否则返回字典列表
         """
+        # 并发的相同查询只执行一次，共享同一结果
+        return self._single_flight.do((keyword, page_size, max_count, max_page), self._search,
+                                      keyword, page_size, max_count, max_page, concurrency, pipeline)
+
+    def _search(self, keyword: str, page_size: int, max_count: Optional[int],
+                max_page: Optional[int], concurrency: int,
+                pipeline: bool = False) -> Union[DataFrame, List[Dict[str, Any]]]:
+        """执行查询，参数同search"""
+        cache = self.cache or get_default_cache()
+        if cache is not None:
+            cache_key = cache.make_key("emxg", keyword, page_size=page_size, max_count=max_count, max_page=max_page,
+                                       compact=self.data_processor.compact, downcast=self.data_processor.downcast)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"命中缓存: {keyword}")
+                return cached
+
+        if pipeline:
+            # 网络请求与数据转换重叠进行，最后只需合并已转换的各页
+            pages = list(self.iter_pages(keyword, page_size, max_count, max_page,
+                                         concurrency=concurrency, prefetch=True))
+            if not pages:
+                return self.data_processor.create_dataframe([])
+            df = concat(pages, ignore_index=True)
+        else:
+            all_data = []
+            columns = []
+
+            for columns, data_list in self._iter_raw_pages(keyword, page_size, max_count, max_page,
+                                                           concurrency=concurrency):
+                all_data.extend(data_list)
+
+            if not all_data:
+                return self.data_processor.create_dataframe([])
+
+            # 使用适配器处理数据
+            df = self.data_processor.process_data(all_data, columns)
+
+        logger.info(f"查询完成，共获取{len(df)}条数据")
+
+        if cache is not None:
+            cache.set(cache_key, df)
+
+        # 根据环境返回不同的数据类型
+        return df
+
+    def search_delta(self, keyword: str = "今日涨停", key_column: str = "代码", **kwargs: Any) -> Delta:
+        """
+        查询并返回与同一关键词上一次查询相比新增、删除和数值变化的行
+
+        首次调用时所有行都视为新增
+
+        Args:
+            keyword: 查询关键词
+            key_column: 唯一标识一行的列名，默认为股票代码
+            **kwargs: 传给search的其他参数
+
+        Returns:
+            Delta: 差异结果
+        """
+        tracker = self._delta_trackers.get((keyword, key_column))
+        if tracker is None:
+            tracker = self._delta_trackers[(keyword, key_column)] = DeltaTracker(key_column)
+        return tracker.update(self.search(keyword, **kwargs))
+
+    def watch(self, keyword: str = "今日涨停", interval: float = 5, key_column: str = "代码",
+              **kwargs: Any) -> Iterator[Delta]:
+        """
+        按固定间隔轮询，只在结果有变化时产出差异
+
+        单次查询失败时记录日志并在下一个间隔重试
+
+        Args:
+            keyword: 查询关键词
+            interval: 轮询间隔（秒）
+            key_column: 唯一标识一行的列名，默认为股票代码
+            **kwargs: 传给search的其他参数
+
+        Yields:
+            Delta: 非空的差异结果
+        """
+        while True:
+            started = time.monotonic()
+            try:
+                delta = self.search_delta(keyword, key_column=key_column, **kwargs)
+            except Exception as e:
+                logger.warning(f"轮询[{keyword}]失败: {str(e)}")
+                delta = None
+            if delta:
+                yield delta
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def iter_pages(self,
+                   keyword: str = "今日涨停",
+                   page_size: int = 50,
+                   max_count: Optional[int] = None,
+                   max_page: Optional[int] = None,
+                   concurrency: int = 1,
+                   prefetch: bool = False) -> Iterator[DataFrame]:
+        """
+        逐页获取股票数据，每获取一页即产出转换后的DataFrame
+
+        所有页面沿用首页的列定义进行列名映射和类型转换
+
+        Args:
+            keyword: 查询关键词，默认为"今日涨停"
+            page_size: 每页数量，默认50
+            max_count: 最大返回数据条数，None表示不限制
+            max_page: 最大页数，None表示不限制
+            concurrency: 并发请求数，大于1时在获取首页得到总数后并发获取剩余页面
+            prefetch: 是否在调用方处理当前页时预先获取下一页
+
+        Yields:
+            DataFrame: 每页转换后的数据
+        """
+        first_columns = None
+        for columns, data_list in self._iter_raw_pages(keyword, page_size, max_count, max_page,
+                                                       concurrency=concurrency, prefetch=prefetch):
+            if first_columns is None:
+                first_columns = columns
+            yield self.data_processor.process_data(data_list, first_columns)
+
+    def iter_rows(self, keyword: str = "今日涨停", **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        """逐行产出转换后的数据，参数同iter_pages"""
+        for page in self.iter_pages(keyword, **kwargs):
+            yield from to_records(page)
+
+
+# 缓存的客户端实例
+@lru_cache(maxsize=1)
+def create_client() -> EMStockClient:
+    """创建并缓存EMStockClient实例"""
+    return EMStockClient()
+
+
+def search_emxg(keyword: str, max_count: Optional[int] = None,
+               max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
+    """
+    便捷的股票搜索函数，使用缓存的客户端实例
+
+    Args:
+        keyword: 查询关键词
+        max_count: 最大返回数据条数，None表示不限制
+        max_page: 最大页数，None表示不限制
+
+    Returns:
+        Union[DataFrame, List[Dict]]: 股票数据，有pandas返回DataFrame，否则返回字典列表
+    """
+    try:
+        return create_client().search(keyword, page_size=EM_PAGE_SIZE, max_count=max_count, max_page=max_page)
+    except Exception as e:
+        logger.error('获取东方财富数据失败: %s', e)
+        logger.debug(format_exc())
+    return None
+
+
+def search_many(keywords: Iterable[str],
+                concurrency: int = 4,
+                max_count: Optional[int] = None,
+                max_page: Optional[int] = None,
+                timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    批量查询多个关键词，共享缓存客户端的会话连接池和指纹
+
+    Args:
+        keywords: 关键词列表
+        concurrency: 最大并发查询数
+        max_count: 每个关键词最大返回数据条数，None表示不限制
+        max_page: 每个关键词最大页数，None表示不限制
+        timeout: 单个关键词超时时间（秒），None表示不限制
+
+    Returns:
+        Tuple[Dict, Dict]: (关键词到DataFrame的字典，失败为None；关键词到状态/耗时/错误报告的字典)
+    """
+    client = create_client()
+    return run_batch(
+        lambda keyword: client.search(keyword, page_size=EM_PAGE_SIZE, max_count=max_count, max_page=max_page),
+        keywords, concurrency=concurrency, timeout=timeout)
+
+
+class AsyncEMStockClient(EMRequestMixin, AsyncSessionClient):
+    """东方财富条件选股异步查询客户端（基于aiohttp）
+
+    同一个客户端实例内的所有查询共享一个连接池，可在单个事件循环中并发执行大量查询。
+    """
+
+    def __init__(self, session: Any = None, limit: int = 100, timeout: float = 30):
+        """
+        Args:
+            session: 外部传入的aiohttp.ClientSession，None表示首次请求时自动创建
+            limit: 自动创建连接池时的最大连接数
+            timeout: 单次请求超时时间（秒）
+        """
+        self._init_session(session, limit, timeout)
+        self.base_url = EM_SEARCH_URL
+        self.data_processor = DataProcessor()
+        self.fingerprint = get_printfinger()
+
+    async def _post(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """发送查询请求并返回解析后的JSON"""
+        await athrottle("emxg")
+        async with self._get_session().post(self.base_url, json=request_data) as response:
+            response.raise_for_status()
+            return loads(await response.read())
+
+    async def search(self,
+                     keyword: str = "今日涨停",
+                     page_size: int = 50,
+                     max_count: Optional[int] = None,
+                     max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
+        """
+        异步搜索股票数据，参数和返回值与EMStockClient.search一致
+        """
+        plan = plan_pages(max_count, max_page, page_size)
+        page_size = plan.page_size
         all_data = []
         page_no = 1
         xc_id = ""  # 首次请求为空
 
         while True:
-            # 构建请求数据
-            request_data = {
-                "keyWord": keyword,
-                "pageSize": page_size,
-                "pageNo": page_no,
-                "fingerprint": self.fingerprint,
-                "gids": [],
-                "matchWord": "",
-                "timestamp": str(int(time.time() * 1000000)),
-                "shareToGuba": False,
-                "requestId": self._generate_request_id(),
-                "needCorrect": True,
-                "removedConditionIdList": [],
-                "xcId": xc_id,
-                "ownSelectAll": False,
-                "dxInfo": [],
-                "extraCondition": ""
-            }
+            request_data = self._build_request_data(keyword, page_size, page_no, xc_id)
 
             try:
-                response = self.session.post(
-                    self.base_url,
-                    json=request_data,
-                    timeout=30
-                )
-                response.raise_for_status()
-
-                data = response.json()
-
-                if data.get("code") != "100":
-                    if page_no == 1:  # 第一页就失败，抛出异常
-                        raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
-                    else:  # 后续页面失败，可能是没有更多数据了
-                        break
+                result = self._extract_result(await self._post(request_data), page_no)
+                if result is None:
+                    break
 
-                # 解析数据
-                result = data.get("data", {}).get("result", {})
                 columns = result.get("columns", [])
                 data_list = result.get("dataList", [])
                 total = result.get("total", 0)
 
-                # 更新xcId用于下次请求
                 if "xcId" in result:
                     xc_id = result["xcId"]
 
                 if not data_list:
                     break
 
-                # 添加当前页数据
                 all_data.extend(data_list)
 
                 logger.debug(f"已获取第{page_no}页数据，本页{len(data_list)}条，累计{len(all_data)}条")
 
-                # 检查是否达到限制条件
-                if max_count and len(all_data) >= max_count:
-                    all_data = all_data[:max_count]
+                if plan.remaining(len(all_data)) == 0:
+                    all_data = all_data[:plan.limit]
                     break
 
-                if max_page and page_no >= max_page:
+                if plan.page_count and page_no >= plan.page_count:
                     break
 
-                # 检查是否还有更多数据
                 if len(data_list) < page_size or len(all_data) >= total:
                     break
 
@@ -131,28 +495,28 @@ class EMStockClient:
                     break
 
         if not all_data:
-            return DataFrame([])
+            return self.data_processor.create_dataframe([])
 
-        # 使用适配器处理数据
         df = self.data_processor.process_data(all_data, columns)
 
         logger.info(f"查询完成，共获取{len(df)}条数据")
 
-        # 根据环境返回不同的数据类型
         return df
 
 
-# 缓存的客户端实例
-@lru_cache(maxsize=1)
-def create_client() -> EMStockClient:
-    """创建并缓存EMStockClient实例"""
-    return EMStockClient()
+# 每个事件循环缓存一个异步客户端实例
+_async_clients: 'WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncEMStockClient]' = WeakKeyDictionary()
 
 
-def search_emxg(keyword: str, max_count: Optional[int] = None,
-               max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
+def create_async_client() -> AsyncEMStockClient:
+    """创建并缓存当前事件循环的AsyncEMStockClient实例"""
+    return loop_local(_async_clients, AsyncEMStockClient)
+
+
+async def asearch_emxg(keyword: str, max_count: Optional[int] = None,
+                       max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
     """
-    便捷的股票搜索函数，使用缓存的客户端实例
+    search_emxg的异步版本，使用当前事件循环缓存的异步客户端实例
 
     Args:
         keyword: 查询关键词
@@ -163,8 +527,8 @@ def search_emxg(keyword: str, max_count: Optional[int] = None,
         Union[DataFrame, List[Dict]]: 股票数据，有pandas返回DataFrame，否则返回字典列表
     """
     try:
-        return create_client().search(keyword, page_size=50, max_count=max_count, max_page=max_page)
+        return await create_async_client().search(keyword, page_size=EM_PAGE_SIZE, max_count=max_count, max_page=max_page)
     except Exception as e:
-        logger.error('获取东方财富数据失败', e)
+        logger.error('获取东方财富数据失败: %s', e)
         logger.debug(format_exc())
     return None
@@ -1,201 +1,670 @@
 """
 数据处理适配器模块
-自动选择 pandas 或纯Python实现数据处理功能
+自动选择 pandas 或纯Python实现数据处理功能，也可通过环境变量 EMXG_BACKEND 指定 polars 或 arrow 后端
 """
 
 import logging
-from typing import Any, Dict, List, Optional, Union, Tuple
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union, Tuple
 import importlib.util
 
 logger = logging.getLogger(__package__)
 
+# 布尔类型字段中视为True的取值
+BOOL_TRUE_VALUES = ['首板', 'True', '1', 'true']
 
-if importlib.util.find_spec("pandas") is None:
+# 压缩存储时，不同取值数不超过行数的该比例的字符串列转为分类类型
+CATEGORY_RATIO = 0.5
+
+# float()可以解析的常规数值写法
+NUMBER_PATTERN = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+
+# 可选的数据处理后端及其依赖的库
+BACKENDS = {'pandas': 'pandas', 'polars': 'polars', 'arrow': 'pyarrow', 'python': None}
+
+
+def _select_backend() -> str:
+    """
+    选择数据处理后端
+
+    环境变量 EMXG_BACKEND 可指定 pandas、polars、arrow 或 python，
+    未指定时安装了pandas使用pandas，否则使用纯Python实现
+    """
+    backend = os.environ.get("EMXG_BACKEND", "").strip().lower()
+    if not backend:
+        return "python" if importlib.util.find_spec("pandas") is None else "pandas"
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的数据处理后端: {backend}，可选: {', '.join(BACKENDS)}")
+    package = BACKENDS[backend]
+    if package is not None and importlib.util.find_spec(package) is None:
+        raise ImportError(f"请安装 {package} 库以支持 {backend} 后端: pip install {package}")
+    return backend
+
+
+BACKEND = _select_backend()
+
+
+if BACKEND == "python":
     import csv
+    import sys
+    from array import array
+
+    def _pack_column(values: List[Any]) -> Union['array[float]', List[Any]]:
+        """压缩列存储：全部为浮点数的列使用array('d')，其余列中相同的字符串共享同一对象"""
+        if values and all(type(v) is float for v in values):
+            return array('d', values)
+        interned: Dict[str, str] = {}
+        return [interned.setdefault(v, v) if type(v) is str else v for v in values]
+
+    def _take(column: Union['array[float]', List[Any]], indexes: List[int]) -> Union['array[float]', List[Any]]:
+        """按行号取出列中的元素，保持存储类型"""
+        values = [column[i] for i in indexes]
+        return array(column.typecode, values) if isinstance(column, array) else values
 
     class DataFrame:
-        """DataFrame适配器类"""
+        """DataFrame适配器类
+
+        按列存储数据：浮点数列使用array('d')，字符串列中相同的字符串共享同一对象，列名只保存一次
+        """
 
-        def __init__(self, data: List[Dict[str, Any]],
+        def __init__(self, data: Union[List[Dict[str, Any]], Dict[str, List[Any]], None] = None,
                     columns: Optional[List[Dict[str, Any]]] = None):
-            self.data = data.copy() if data else []
+            self._data: Dict[str, Union['array[float]', List[Any]]] = {}
+            self._length = 0
+            if isinstance(data, dict):
+                # 列名到列数据的字典
+                self._length = len(next(iter(data.values()))) if data else 0
+                for name, values in data.items():
+                    self._data[name] = _pack_column(list(values))
+            elif data:
+                # 行字典列表，列顺序为各键首次出现的顺序
+                names: Dict[str, None] = {}
+                for row in data:
+                    if row.keys() != names.keys():
+                        names.update(dict.fromkeys(row))
+                self._length = len(data)
+                for name in names:
+                    self._data[name] = _pack_column([row.get(name) for row in data])
+
+        @classmethod
+        def _from_columns(cls, data: Dict[str, Union['array[float]', List[Any]]], length: int) -> 'DataFrame':
+            """直接使用已有的列存储创建DataFrame，不复制数据"""
+            df = cls()
+            df._data = data
+            df._length = length
+            return df
+
+        @classmethod
+        def from_dict(cls, data: Union[List[Dict[str, Any]], Dict[str, List[Any]]]) -> 'DataFrame':
+            """从行字典列表或列字典创建DataFrame"""
+            return cls(data)
+
+        @property
+        def data(self) -> List[Dict[str, Any]]:
+            """按行返回数据（每次调用重新生成行字典）"""
+            return self.to_dict('records')
 
         @property
         def empty(self) -> bool:
             """检查数据是否为空"""
-            return len(self.data) == 0
+            return self._length == 0
 
         @property
         def columns(self) -> List[str]:
             """获取列名列表"""
-            return list(self.data[0].keys()) if self.data else []
+            return list(self._data)
 
         @property
         def shape(self) -> Tuple[int, int]:
             """获取数据形状"""
-            return (len(self.data), len(self.columns) if self.data else 0)
+            return (self._length, len(self._data) if self._length else 0)
 
         def head(self, n: int = 5) -> 'DataFrame':
             """获取前n行数据"""
-            return DataFrame(data=self.data[:n])
+            return self[:n]
 
         def sort_values(self, by: str, ascending: bool = True) -> 'DataFrame':
             """按指定列排序"""
-            if not self.data or by not in self.columns:
+            if not self._length or by not in self._data:
                 return self
 
-            sorted_data = sorted(self.data, key=lambda x: x.get(by, 0), reverse=not ascending)
-            return DataFrame(data=sorted_data)
+            column = self._data[by]
+            order = sorted(range(self._length), key=column.__getitem__, reverse=not ascending)
+            return DataFrame._from_columns({name: _take(values, order) for name, values in self._data.items()},
+                                           self._length)
+
+        def _rows(self) -> Iterator[Tuple[Any, ...]]:
+            """逐行产出值元组"""
+            return zip(*self._data.values())
 
         def to_csv(self, filepath: str, index: bool = False, encoding: str = 'utf-8') -> None:
             """保存为CSV文件"""
-            if not self.data:
+            if not self._length:
                 return
 
-            fieldnames = self.columns
             with open(filepath, 'w', newline='', encoding=encoding) as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer = csv.writer(csvfile)
                 if not index:
-                    writer.writeheader()
-                writer.writerows(self.data)
+                    writer.writerow(self.columns)
+                writer.writerows(('' if v is None else v for v in row) for row in self._rows())
 
         def to_excel(self, filepath: str, index: bool = False) -> None:
             """保存为Excel文件（需要openpyxl库）"""
-            if not self.data:
+            if not self._length:
                 return
             try:
                 from openpyxl import Workbook
             except ImportError:
                 raise ImportError("请安装 openpyxl 库以支持 Excel 导出: pip install openpyxl")
 
-            wb = Workbook()
-            ws = wb.active
+            # 只写模式逐行写出，不在内存中保留整个工作表
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet()
             if not index:
                 ws.append(self.columns)
-            for row in self.data:
-                ws.append([row.get(col, '') for col in self.columns])
+            for row in self._rows():
+                ws.append(['' if v is None else v for v in row])
             wb.save(filepath)
 
         def to_dict(self, orient: str = 'records') -> Union[List[Dict], Dict]:
             """转换为字典格式"""
             if orient == 'records':
-                return self.data
+                names = self.columns
+                return [dict(zip(names, row)) for row in self._rows()]
             elif orient == 'dict':
-                result = {}
-                for col in self.columns:
-                    result[col] = [row.get(col) for row in self.data]
-                return result
+                return {name: list(values) for name, values in self._data.items()}
             else:
                 raise ValueError(f"不支持的orient参数: {orient}")
 
         def __len__(self) -> int:
             """返回数据行数"""
-            return len(self.data)
+            return self._length
 
         def __getitem__(self, key):
             """支持列访问"""
             if isinstance(key, str):
-                return [row.get(key) for row in self.data]
+                if key not in self._data:
+                    return [None] * self._length
+                return list(self._data[key])
             elif isinstance(key, slice):
-                return DataFrame(data=self.data[key])
+                indexes = range(self._length)[key]
+                return DataFrame._from_columns({name: values[key] for name, values in self._data.items()},
+                                               len(indexes))
             elif isinstance(key, (list, tuple)):
-                return DataFrame(data=[{col: row[col] for col in key} for row in self.data])
+                missing = [col for col in key if col not in self._data]
+                if missing:
+                    raise KeyError(f"列不存在: {missing}")
+                return DataFrame._from_columns({col: self._data[col] for col in key}, self._length)
             else:
                 raise KeyError(f"不支持的key类型: {type(key)}")
 
         def __iter__(self):
             """支持迭代"""
-            return enumerate(self.data)
+            names = self.columns
+            return enumerate(dict(zip(names, row)) for row in self._rows())
 
         def rename(self, columns: Dict[str, str]) -> 'DataFrame':
             """重命名列"""
-            return DataFrame(data=[{columns.get(col, col): value for col, value in row.items()} for row in self.data])
+            return DataFrame._from_columns({columns.get(name, name): values for name, values in self._data.items()},
+                                           self._length)
 
         def assign(self, **kwargs) -> 'DataFrame':
             """添加或修改列"""
-            new_data = []
-            for row in self.data:
-                new_row = row.copy()
-                for key, value in kwargs.items():
-                    if callable(value):
-                        new_row[key] = value(new_row)
-                    else:
-                        new_row[key] = value
-                new_data.append(new_row)
-            return DataFrame(data=new_data)
-
-    def process_column_mapping(df: DataFrame, columns_info: List[Dict[str, Any]]) -> DataFrame:
-        """使用纯Python处理列名映射"""
-        # 处理列名映射
-        column_mapping = {}
-        title_counts = {}
-
-        for col in columns_info:
-            key = col.get("key", "")
-            title = col.get("title", key) if 'title' in col else col.get('index_name', key)
-
-            if key and key in df.columns and df.data[0] and key in df.data[0]:
-                if title in title_counts:
-                    title_counts[title] += 1
-                    if '{' in key and '}' in key:
-                        time_part = key[key.find('{')+1:key.find('}')]
-                        unique_title = f"{title}({time_part})"
-                    else:
-                        unique_title = f"{title}_{title_counts[title]}"
+            data = dict(self._data)
+            rows = self.to_dict('records')
+            for key, value in kwargs.items():
+                if callable(value):
+                    values = [value(row) for row in rows]
                 else:
-                    title_counts[title] = 1
-                    unique_title = title
+                    values = [value] * self._length
+                for row, v in zip(rows, values):
+                    row[key] = v
+                data[key] = _pack_column(values)
+            return DataFrame._from_columns(data, self._length)
+
+    def create_frame(data: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> DataFrame:
+        """由字典列表创建DataFrame"""
+        return DataFrame(data=data, columns=columns)
+
+    def rename_columns(df: DataFrame, mapping: Dict[str, str]) -> DataFrame:
+        """按映射重命名列"""
+        return df.rename(mapping)
+
+    def column_names(df: DataFrame) -> List[str]:
+        """返回列名列表"""
+        return list(df.columns)
+
+    def head(df: DataFrame, n: int) -> DataFrame:
+        """返回前n行"""
+        return df.head(n)
 
-                column_mapping[key] = unique_title
+    def to_records(df: DataFrame) -> List[Dict[str, Any]]:
+        """转换为字典列表"""
+        return df.to_dict('records')
 
-        return df.rename(column_mapping)
+    def iter_tuples(df: DataFrame) -> Iterator[Tuple[Any, ...]]:
+        """逐行产出值元组，顺序同column_names"""
+        return df._rows()
 
     def concat(dfs: List[DataFrame], ignore_index=True) -> DataFrame:
         """连接多个DataFrame"""
-        combined_data = []
+        names: Dict[str, None] = {}
         for df in dfs:
-            combined_data.extend(df.data)
-        return DataFrame(data=combined_data)
+            names.update(dict.fromkeys(df._data))
+
+        data = {}
+        for name in names:
+            parts = [df._data.get(name) or [None] * len(df) for df in dfs]
+            if all(isinstance(part, array) for part in parts):
+                column = array('f' if all(part.typecode == 'f' for part in parts) else 'd')
+                for part in parts:
+                    column.extend(part)
+                data[name] = column
+            else:
+                data[name] = _pack_column([v for part in parts for v in part])
+        return DataFrame._from_columns(data, sum(len(df) for df in dfs))
 
-else:
+    def _column_size(column: Union['array[float]', List[Any]]) -> int:
+        """估算列占用的内存，共享的对象只计算一次"""
+        if isinstance(column, array):
+            return sys.getsizeof(column)
+        unique = {id(v): v for v in column}
+        return sys.getsizeof(column) + sum(sys.getsizeof(v) for v in unique.values())
+
+    def compact_frame(df: DataFrame, downcast: bool = False) -> Tuple[DataFrame, Dict[str, Tuple[int, int]]]:
+        """
+        压缩列存储，返回压缩后的DataFrame和各列压缩前后的内存占用(字节)
+
+        字符串列中相同的字符串已共享同一对象，相当于分类存储；downcast为True时浮点数列改用array('f')
+        """
+        data = {}
+        report = {}
+        for name, column in df._data.items():
+            before = _column_size(column)
+            if downcast and isinstance(column, array) and column.typecode == 'd':
+                column = array('f', column)
+            data[name] = column
+            report[name] = (before, _column_size(column))
+        return DataFrame._from_columns(data, df._length), report
+
+    def compile_converters(conversions: List[Tuple[str, str]],
+                           processor: 'DataProcessor') -> List[Tuple[str, Callable[[Any], Any]]]:
+        """把(列名, 转换类型)列表编译为(列名, 转换函数)表"""
+        converter_by_kind = {
+            'number': processor._convert_chinese_number,
+            'percent': processor._convert_percent_number,
+            'bool': processor._convert_bool,
+        }
+        return [(col_name, converter_by_kind[kind]) for col_name, kind in conversions]
+
+    def convert_columns(df: DataFrame, conversions: List[Tuple[str, str]],
+                        processor: 'DataProcessor') -> DataFrame:
+        """按列转换数据类型，conversions为(列名, 转换类型)列表，类型为number/percent/bool
+
+        每列单次遍历生成新列，未转换的列与原DataFrame共享存储
+        """
+        converters = compile_converters(conversions, processor)
+        if not converters:
+            return df
+
+        data = dict(df._data)
+        for col_name, convert in converters:
+            if col_name in data:
+                data[col_name] = _pack_column([convert(v) for v in data[col_name]])
+        return DataFrame._from_columns(data, len(df))
+
+elif BACKEND == "pandas":
     import pandas as pd
+    from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_object_dtype
     DataFrame = pd.DataFrame
 
-    def process_column_mapping(df: DataFrame, columns_info: List[Dict[str, Any]]) -> DataFrame:
-        """使用pandas处理列名映射"""
-        # 处理列名映射
-        column_mapping = {}
-        title_counts = {}
-
-        for col in columns_info:
-            key = col.get("key", "")
-            title = col.get("title", key) if 'title' in col else col.get('index_name', key)
-
-            if key and key in df.columns:
-                if title in title_counts:
-                    title_counts[title] += 1
-                    if '{' in key and '}' in key:
-                        time_part = key[key.find('{')+1:key.find('}')]
-                        unique_title = f"{title}({time_part})"
-                    else:
-                        unique_title = f"{title}_{title_counts[title]}"
-                else:
-                    title_counts[title] = 1
-                    unique_title = title
+    # 有pyarrow时定长代码列可以使用连续的字符串存储，含单位的数值列使用计算内核解析
+    _ARROW_STRINGS = importlib.util.find_spec("pyarrow") is not None
+    if _ARROW_STRINGS:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from pandas.api.types import infer_dtype
+
+    def create_frame(data: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> DataFrame:
+        """由字典列表创建DataFrame"""
+        return DataFrame(data=data, columns=columns)
+
+    def rename_columns(df: DataFrame, mapping: Dict[str, str]) -> DataFrame:
+        """使用pandas按映射重命名列"""
+        return df.rename(columns=mapping)
 
-                column_mapping[key] = unique_title
+    def column_names(df: DataFrame) -> List[str]:
+        """返回列名列表"""
+        return list(df.columns)
 
-        # 重命名列
-        return df.rename(columns=column_mapping)
+    def head(df: DataFrame, n: int) -> DataFrame:
+        """返回前n行"""
+        return df.head(n)
+
+    def to_records(df: DataFrame) -> List[Dict[str, Any]]:
+        """转换为字典列表"""
+        return df.to_dict('records')
+
+    def iter_tuples(df: DataFrame) -> Iterator[Tuple[Any, ...]]:
+        """逐行产出值元组，顺序同column_names"""
+        return df.itertuples(index=False, name=None)
 
     def concat(dfs: List[DataFrame], ignore_index=True) -> DataFrame:
         """连接多个DataFrame"""
-        return pd.concat(dfs, ignore_index=True)
+        result = pd.concat(dfs, ignore_index=True)
+        if not result.columns.is_unique:
+            return result
+        # 各部分的类别不同时分类列会退化为object，重新转换为分类类型
+        dtypes = [dict(df.dtypes.items()) for df in dfs]
+        for name, dtype in result.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                continue
+            if all(isinstance(d[name], pd.CategoricalDtype) for d in dtypes if name in d):
+                result[name] = result[name].astype('category')
+        return result
+
+    def _is_code_column(values: List[Any]) -> bool:
+        """判断是否为定长的代码列，如股票代码"""
+        if not values or not isinstance(values[0], str):
+            return False
+        width = len(values[0])
+        return all(isinstance(v, str) and len(v) == width and v.isascii() for v in values)
+
+    def _compact_strings(series: 'pd.Series') -> Optional['pd.Series']:
+        """压缩字符串列，无法压缩时返回None"""
+        # 不使用Series.nunique，它会在列上缓存哈希表而增加内存占用
+        values = series.tolist()
+        try:
+            unique = len(set(values))
+        except TypeError:
+            # 含有字典、列表等不可哈希的值
+            return None
+        if unique <= len(values) * CATEGORY_RATIO:
+            return series.astype('category')
+        if _ARROW_STRINGS and _is_code_column(values):
+            return series.astype(pd.StringDtype("pyarrow"))
+        return None
+
+    def compact_frame(df: DataFrame, downcast: bool = False) -> Tuple[DataFrame, Dict[str, Tuple[int, int]]]:
+        """
+        压缩列存储，返回压缩后的DataFrame和各列压缩前后的内存占用(字节)
+
+        低基数的字符串列转为分类类型，定长代码列在有pyarrow时使用连续存储，downcast为True时float64降为float32
+        """
+        before = df.memory_usage(index=False, deep=True)
+        df = df.copy(deep=False)
+        for i in range(df.shape[1]):
+            series = df.iloc[:, i]
+            if downcast and series.dtype == 'float64':
+                compacted = series.astype('float32')
+            elif len(series) and (is_object_dtype(series.dtype) or isinstance(series.dtype, pd.StringDtype)):
+                compacted = _compact_strings(series)
+            else:
+                compacted = None
+            if compacted is not None:
+                df.isetitem(i, compacted)
+        after = df.memory_usage(index=False, deep=True)
+        return df, {name: (int(before.iloc[i]), int(after.iloc[i])) for i, name in enumerate(df.columns)}
+
+    def _to_float(values: 'pd.Series') -> Optional['pd.Series']:
+        """整列转换为float64，含无法解析的元素时返回None
+
+        object列的astype逐个调用float()完成解析，结果与标量转换完全一致，而pandas在未安装pyarrow时
+        的字符串方法仍是逐元素的Python循环，因此规范数值列优先走这条路径
+        """
+        try:
+            return values.astype('float64')
+        except (TypeError, ValueError):
+            return None
+
+    def _round4(values: 'pd.Series') -> 'pd.Series':
+        """保留4位小数，与内置round结果一致
+
+        向量化舍入先放大再取整，只有在放大后接近.5的位置才可能与内置round不同，这些位置单独使用round
+        """
+        scaled = values * 10000
+        rounded = scaled.round()
+        result = rounded / 10000
+        near_tie = ((scaled - rounded).abs() - 0.5).abs() < 1e-6
+        if near_tie.any():
+            result[near_tie] = values[near_tie].map(lambda v: round(v, 4))
+        return result
+
+    def _match_number(text: 'pa.Array') -> Tuple['pa.Array', 'pa.Array']:
+        """解析常规数值写法的字符串，返回(是否可解析, float64数值)"""
+        valid = pc.fill_null(pc.match_substring_regex(text, NUMBER_PATTERN), False)
+        return valid, pc.cast(pc.if_else(valid, text, pa.scalar(None, text.type)), pa.float64())
+
+    def _parse_strings(series: 'pd.Series', percent: bool = False) -> Optional[Tuple['pd.Series', 'pd.Series']]:
+        """使用计算内核解析字符串列，返回(数值, 未能解析的非空位置)，没有pyarrow或列中含非字符串元素时返回None
+
+        解析规则同DataProcessor的逐元素转换：去除空白后按"亿"/"万"单位解析，percent为True时再尝试去除%后解析。
+        pyarrow的字符串转浮点数与float()结果一致，而pd.to_numeric的解析在末位可能有舍入误差，因此不使用
+        """
+        if not _ARROW_STRINGS or infer_dtype(series, skipna=True) != 'string':
+            return None
+        text = pc.utf8_trim_whitespace(pa.array(series, pa.string(), from_pandas=True))
+        has_yi = pc.fill_null(pc.match_substring(text, '亿'), False)
+        has_wan = pc.fill_null(pc.match_substring(text, '万'), False)
+        digits = pc.if_else(has_yi, pc.replace_substring(text, '亿', ''),
+                            pc.if_else(has_wan, pc.replace_substring(text, '万', ''), text))
+        valid, numbers = _match_number(digits)
+        numbers = pc.multiply(numbers, pc.if_else(has_yi, 100000000.0, pc.if_else(has_wan, 10000.0, 1.0)))
+        if percent:
+            percent_valid, percent_numbers = _match_number(
+                pc.utf8_trim_whitespace(pc.replace_substring(text, '%', '')))
+            numbers = pc.if_else(valid, numbers, percent_numbers)
+            valid = pc.or_(valid, percent_valid)
+        number = pd.Series(numbers.to_numpy(zero_copy_only=False), index=series.index, dtype='float64')
+        failed = series.notna() & ~valid.to_numpy(zero_copy_only=False)
+        return number, failed
+
+    def _merge_fallback(series: 'pd.Series', number: 'pd.Series', failed: 'pd.Series', fallback: Any) -> 'pd.Series':
+        """已解析的位置使用number，未能解析的元素逐个调用fallback转换，结果尽量为float64"""
+        converted = series.astype(object)
+        parsed = series.notna() & ~failed
+        converted[parsed] = number[parsed]
+        converted[failed] = series[failed].map(fallback)
+        number = _to_float(converted)
+        return converted if number is None else number
+
+    def convert_number_series(series: 'pd.Series', fallback: Any) -> 'pd.Series':
+        """转换数值列，支持"亿"/"万"单位，结果尽量为float64"""
+        if is_numeric_dtype(series) or is_bool_dtype(series):
+            return series
+        number = _to_float(series)
+        if number is not None:
+            return number
+        parsed = _parse_strings(series)
+        if parsed is None:
+            # 含单位或无法解析的元素，单次遍历转换
+            return _merge_fallback(series, series, series.notna(), fallback)
+        number, failed = parsed
+        return _merge_fallback(series, number, failed, fallback) if failed.any() else number
+
+    def convert_percent_series(series: 'pd.Series', fallback: Any) -> 'pd.Series':
+        """转换百分比列为小数，保留4位，fallback为把单个原始值转换为小数的函数"""
+        if is_bool_dtype(series):
+            return _round4(series.astype('float64') / 100)
+        number = series if is_numeric_dtype(series) else _to_float(series)
+        if number is not None:
+            return _round4(number / 100)
+        parsed = _parse_strings(series, percent=True)
+        if parsed is None:
+            return _merge_fallback(series, series, series.notna(), fallback)
+        number, failed = parsed
+        number = _round4(number / 100)
+        return _merge_fallback(series, number, failed, fallback) if failed.any() else number
+
+    def convert_bool_series(series: 'pd.Series') -> 'pd.Series':
+        """转换布尔列"""
+        return series.astype(str).str.strip().isin(BOOL_TRUE_VALUES)
+
+    def convert_columns(df: DataFrame, conversions: List[Tuple[str, str]],
+                        processor: 'DataProcessor') -> DataFrame:
+        """按列向量化转换数据类型，conversions为(列名, 转换类型)列表，类型为number/percent/bool"""
+        converted = {}
+        for col_name, kind in conversions:
+            series = converted.get(col_name, df[col_name])
+            if kind == 'number':
+                series = convert_number_series(series, processor._convert_chinese_number)
+            elif kind == 'percent':
+                series = convert_percent_series(series, processor._convert_percent_number)
+            elif kind == 'bool':
+                series = convert_bool_series(series)
+            converted[col_name] = series
+
+        if not converted:
+            return df
+        df = df.copy(deep=False)
+        for col_name, series in converted.items():
+            df[col_name] = series
+        return df
+
+elif BACKEND == "arrow":
+    from .arrow_adapter import (DataFrame, column_names, compact_frame, concat, convert_columns, create_frame,
+                                head, iter_tuples, rename_columns, to_records)
+
+else:
+    from .polars_adapter import (DataFrame, column_names, compact_frame, concat, convert_columns, create_frame,
+                                 head, iter_tuples, rename_columns, to_records)
+
+
+def _column_fields(col: Dict[str, Any]) -> Tuple[Any, Any, Any, Any]:
+    """提取列定义中参与映射和类型转换的字段：key、title、数据类型和单位"""
+    key = col.get("key", "")
+    title = col.get("title", key) if 'title' in col else col.get('index_name', key)
+    data_type = col.get("dataType", "") if 'dataType' in col else col.get('type', '')
+    if data_type is None:
+        data_type = ""
+    return key, title, data_type, col.get("unit", "")
+
+
+def _dedupe_fields(fields: Tuple[Tuple[Any, Any, Any, Any], ...]) -> List[Tuple[Any, Any, Any, Any]]:
+    """重复的key只保留第一个出现的列定义"""
+    seen_keys = set()
+    duplicate_keys = set()
+    result = []
+    for field in fields:
+        key = field[0]
+        if key != "":
+            if key in seen_keys:
+                duplicate_keys.add(key)
+                continue
+            seen_keys.add(key)
+        result.append(field)
+
+    if duplicate_keys:
+        logger.warning(f"检测到重复的key: {list(duplicate_keys)}")
+        logger.info(f"去重后保留列定义数: {len(result)}")
+    return result
+
+
+def _column_mapping(fields: List[Tuple[Any, Any, Any, Any]], columns: set) -> Dict[str, str]:
+    """计算key到列标题的映射，重复的标题追加时间或序号后缀"""
+    column_mapping = {}
+    title_counts = {}
+    for key, title, _, _ in fields:
+        if key and key in columns:
+            if title in title_counts:
+                title_counts[title] += 1
+                if '{' in key and '}' in key:
+                    time_part = key[key.find('{')+1:key.find('}')]
+                    unique_title = f"{title}({time_part})"
+                else:
+                    unique_title = f"{title}_{title_counts[title]}"
+            else:
+                title_counts[title] = 1
+                unique_title = title
+
+            column_mapping[key] = unique_title
+    return column_mapping
+
+
+def _conversions(fields: List[Tuple[Any, Any, Any, Any]], columns: set,
+                 rename: Optional[Dict[str, str]] = None) -> Tuple[Tuple[str, str], ...]:
+    """计算需要类型转换的列，columns为映射后的列名，rename为已知的列名映射"""
+    conversions = []
+    rename = rename or {}
+    for key, title, data_type, unit in fields:
+        # 确定要处理的列名，已映射的key使用映射后的列名（可能带有去重后缀）
+        col_name = rename.get(key) or (title if title in columns else key)
+        if not col_name in columns:
+            continue
+
+        if data_type.upper() in ["DOUBLE", "LONG", "INTEGER"]:
+            # 如果单位是%，转换为小数
+            conversions.append((col_name, 'percent' if unit == "%" else 'number'))
+        elif data_type.upper() == "BOOLEAN":
+            conversions.append((col_name, 'bool'))
+    return tuple(conversions)
+
+
+class SchemaPlan:
+    """由列定义编译出的处理计划，被多次查询共享，不应修改"""
+
+    def __init__(self, rename: Dict[str, str], conversions: Tuple[Tuple[str, str], ...]):
+        """
+        Args:
+            rename: 原始key到列标题的映射
+            conversions: (映射后的列名, 转换类型) 列表，转换类型为 number、percent 或 bool
+        """
+        self.rename = rename
+        self.conversions = conversions
+
+    def __repr__(self) -> str:
+        return f"SchemaPlan(rename={len(self.rename)}, conversions={len(self.conversions)})"
+
+
+@lru_cache(maxsize=256)
+def _compile_schema(fields: Tuple[Tuple[Any, Any, Any, Any], ...], columns: Tuple[str, ...]) -> SchemaPlan:
+    fields = _dedupe_fields(fields)
+    rename = _column_mapping(fields, set(columns))
+    renamed = {rename.get(col, col) for col in columns}
+    return SchemaPlan(rename, _conversions(fields, renamed, rename))
+
+
+def compile_schema(columns_info: List[Dict[str, Any]], columns: Iterable[str]) -> SchemaPlan:
+    """
+    编译列定义为处理计划
+
+    同一查询的各分页以及不同查询、不同数据源之间，列定义和数据列相同时复用同一计划
+
+    Args:
+        columns_info: 列信息定义
+        columns: 原始数据的列名
+
+    Returns:
+        SchemaPlan处理计划
+    """
+    fields = tuple(_column_fields(col) for col in columns_info)
+    columns = tuple(columns)
+    try:
+        return _compile_schema(fields, columns)
+    except TypeError:
+        # 列定义中含有不可哈希的值时不缓存
+        return _compile_schema.__wrapped__(fields, columns)
+
+
+def process_column_mapping(df: 'DataFrame', columns_info: List[Dict[str, Any]]) -> 'DataFrame':
+    """处理列名映射"""
+    return rename_columns(df, compile_schema(columns_info, column_names(df)).rename)
 
 
 class DataProcessor:
     """数据处理适配器类"""
 
+    def __init__(self, compact: bool = False, downcast: bool = False):
+        """
+        Args:
+            compact: 是否压缩结果的列存储，见compact_dataframe
+            downcast: 压缩时是否将浮点数列降为32位（会损失精度）
+        """
+        self.compact = compact
+        self.downcast = downcast
+
     def create_dataframe(self, data: List[Dict[str, Any]],
                       columns: Optional[List[Dict[str, Any]]] = None) -> 'DataFrame':
         """
@@ -208,16 +677,20 @@ class DataProcessor:
         Returns:
             DataFrame适配器对象
         """
-        return DataFrame(data=data, columns=columns)
+        return create_frame(data, columns)
 
     def process_data(self, data: List[Dict[str, Any]],
-                   columns_info: List[Dict[str, Any]]) -> 'DataFrame':
+                   columns_info: List[Dict[str, Any]],
+                   compact: Optional[bool] = None,
+                   downcast: Optional[bool] = None) -> 'DataFrame':
         """
         处理原始数据，包括类型转换和数据处理
 
         Args:
             data: 原始数据列表
             columns_info: 列信息定义
+            compact: 是否压缩列存储，None表示使用创建时的设置
+            downcast: 压缩时是否将浮点数列降为32位，None表示使用创建时的设置
 
         Returns:
             处理后的DataFrame适配器对象
@@ -227,61 +700,48 @@ class DataProcessor:
 
         # 处理列名映射和数据转换
         if columns_info:
-            df = self._process_column_mapping(df, columns_info)
-            df = self._convert_data_types(df, columns_info)
+            plan = compile_schema(columns_info, column_names(df))
+            df = rename_columns(df, plan.rename)
+            df = convert_columns(df, plan.conversions, self)
+
+        if self.compact if compact is None else compact:
+            df, _ = self.compact_dataframe(df, self.downcast if downcast is None else downcast)
 
         return df
 
+    def compact_dataframe(self, df: 'DataFrame',
+                          downcast: bool = False) -> Tuple['DataFrame', Dict[str, Tuple[int, int]]]:
+        """
+        压缩列存储以减少内存占用
+
+        低基数的字符串列（如行业、概念）转为分类类型，股票代码等定长字符串列使用紧凑存储，
+        downcast为True时浮点数列降为32位。具体存储方式取决于数据处理后端
+
+        Args:
+            df: 待压缩的数据
+            downcast: 是否将浮点数列降为32位
+
+        Returns:
+            (压缩后的数据, {列名: (压缩前字节数, 压缩后字节数)})
+        """
+        df, report = compact_frame(df, downcast)
+        for name, (before, after) in report.items():
+            logger.debug(f"列[{name}]内存占用: {before} -> {after} 字节")
+        total_before = sum(before for before, _ in report.values())
+        total_after = sum(after for _, after in report.values())
+        logger.info(f"压缩列存储: {total_before / 1024:.1f}KB -> {total_after / 1024:.1f}KB")
+        return df, report
+
     def _process_column_mapping(self, df: 'DataFrame',
                             columns_info: List[Dict[str, Any]]) -> 'DataFrame':
         """处理列名映射"""
-        original_keys = [col.get("key", "") for col in columns_info]
-        duplicate_keys = [key for key in original_keys if original_keys.count(key) > 1 and key != ""]
-
-        if duplicate_keys:
-            logger.warning(f"检测到重复的key: {list(set(duplicate_keys))}")
-            # 只保留第一个出现的key
-            seen_keys = set()
-            columns_filtered = []
-            for col in columns_info:
-                key = col.get("key", "")
-                if key == "" or key not in seen_keys:
-                    columns_filtered.append(col)
-                    if key != "":
-                        seen_keys.add(key)
-            columns_info = columns_filtered
-            logger.info(f"去重后保留列定义数: {len(columns_info)}")
-
         return process_column_mapping(df, columns_info)
 
     def _convert_data_types(self, df: 'DataFrame',
                          columns_info: List[Dict[str, Any]]) -> 'DataFrame':
-        """转换数据类型"""
-        for col_info in columns_info:
-            key = col_info.get("key", "")
-            title = col_info.get("title", key) if 'title' in col_info else col_info.get('index_name', key)
-            data_type = col_info.get("dataType", "") if 'dataType' in col_info else col_info.get('type', '')
-            if data_type is None:
-                data_type = ""
-            unit = col_info.get("unit", "")
-
-            # 确定要处理的列名
-            col_name = title if title in df.columns else key
-            if not col_name in df.columns:
-                continue
-
-            if data_type.upper() in ["DOUBLE", "LONG", "INTEGER"]:
-                df = df.assign(**{col_name: lambda x: x[col_name].apply(self._convert_chinese_number) if hasattr(x[col_name], 'apply') else self._convert_chinese_number(x[col_name])})
-
-                # 如果单位是%，转换为小数
-                if unit == "%":
-                    df = df.assign(**{col_name: lambda x: x[col_name].apply(self._convert_percentage) if hasattr(x[col_name], 'apply') else self._convert_percentage(x[col_name])})
-
-            elif data_type.upper() == "BOOLEAN":
-                # 布尔类型转换
-                df = df.assign(**{col_name: lambda x: x[col_name].apply(self._convert_bool) if hasattr(x[col_name], 'apply') else self._convert_bool(x[col_name])})
-
-        return df
+        """转换数据类型，df的列名需已完成映射"""
+        fields = [_column_fields(col) for col in columns_info]
+        return convert_columns(df, _conversions(fields, set(column_names(df))), self)
 
     def _convert_chinese_number(self, value: Any) -> Union[float, str]:
         """转换中文数字单位为数值"""
@@ -290,11 +750,7 @@ class DataProcessor:
 
         value = value.strip()
 
-        try:
-            return float(value)
-        except ValueError:
-            pass
-
+        # 含单位的字符串不可能直接解析为数值，先判断单位以避免多余的异常开销
         if '亿' in value:
             number_part = value.replace('亿', '')
             try:
@@ -308,7 +764,10 @@ class DataProcessor:
             except ValueError:
                 return value
 
-        return value
+        try:
+            return float(value)
+        except ValueError:
+            return value
 
     def _convert_percentage(self, value: Any) -> Union[float, Any]:
         """转换百分比为小数"""
@@ -324,5 +783,9 @@ class DataProcessor:
         except (ValueError, TypeError):
             return value
 
+    def _convert_percent_number(self, value: Any) -> Union[float, Any]:
+        """转换百分比列的值为小数，先按中文数字单位转换"""
+        return self._convert_percentage(self._convert_chinese_number(value))
+
     def _convert_bool(self, value: Any) -> bool:
-        return str(value).strip() in ['首板', 'True', '1', 'true']
\ No newline at end of file
+        return str(value).strip() in BOOL_TRUE_VALUES
\ No newline at end of file
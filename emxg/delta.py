@@ -0,0 +1,85 @@
+"""
+增量对比
+记录上一次查询结果的快照，只返回新增、删除和数值变化的行
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .data_adapter import to_records
+
+
+class Delta:
+    """两次查询结果之间的差异"""
+
+    def __init__(self,
+                 inserted: Optional[List[Dict[str, Any]]] = None,
+                 deleted: Optional[List[Dict[str, Any]]] = None,
+                 changed: Optional[List[Dict[str, Any]]] = None):
+        """
+        Args:
+            inserted: 新增的行
+            deleted: 被删除的行（上一次的值）
+            changed: 数值发生变化的行（最新的值）
+        """
+        self.inserted = inserted or []
+        self.deleted = deleted or []
+        self.changed = changed or []
+
+    @property
+    def empty(self) -> bool:
+        """是否没有任何变化"""
+        return not (self.inserted or self.deleted or self.changed)
+
+    def __bool__(self) -> bool:
+        return not self.empty
+
+    def __repr__(self) -> str:
+        return f"Delta(inserted={len(self.inserted)}, deleted={len(self.deleted)}, changed={len(self.changed)})"
+
+
+def _row_hash(row: Dict[str, Any]) -> int:
+    """计算行哈希，NaN统一视为None，避免NaN != NaN导致误判为变化"""
+    return hash(tuple((k, v if v == v else None) for k, v in row.items()))
+
+
+class DeltaTracker:
+    """按股票代码保存上一次快照并计算差异"""
+
+    def __init__(self, key_column: str = "代码"):
+        """
+        Args:
+            key_column: 唯一标识一行的列名
+        """
+        self.key_column = key_column
+        self._snapshot: Dict[Hashable, Tuple[int, Dict[str, Any]]] = {}
+
+    def reset(self) -> None:
+        """清空快照，下一次update会把所有行视为新增"""
+        self._snapshot = {}
+
+    def update(self, df: Any) -> Delta:
+        """
+        用最新结果更新快照并返回与上一次的差异
+
+        Args:
+            df: 最新的查询结果，None视为空结果
+
+        Returns:
+            Delta: 新增、删除和变化的行
+        """
+        rows = to_records(df) if df is not None and len(df) else []
+        snapshot = {}
+        delta = Delta()
+        for row in rows:
+            key = row.get(self.key_column)
+            row_hash = _row_hash(row)
+            snapshot[key] = (row_hash, row)
+            previous = self._snapshot.get(key)
+            if previous is None:
+                delta.inserted.append(row)
+            elif previous[0] != row_hash:
+                delta.changed.append(row)
+
+        delta.deleted = [row for key, (_, row) in self._snapshot.items() if key not in snapshot]
+        self._snapshot = snapshot
+        return delta
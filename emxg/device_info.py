@@ -1,9 +1,25 @@
 from functools import lru_cache
+from typing import Dict, Optional
+import logging
+import os
+import queue
 import random
+import struct
+import threading
 import time
 import base64
-import requests
 from fake_useragent import UserAgent
+from .transport import get_transport_config
+
+
+logger = logging.getLogger(__package__)
+
+# 设备信息缓冲区格式（大端序，共43字节），3字节的鼠标移动次数拆成高8位(B)和低16位(H)
+BUFFER_STRUCT = struct.Struct('>IIIIBBBBHHHHHHHHIHB')
+BUFFER_SIZE = BUFFER_STRUCT.size
+
+# simple_hash只取低8位，等价于各字节乘以31的幂后求和
+_HASH_WEIGHTS = [pow(31, BUFFER_SIZE - 1 - i, 256) for i in range(BUFFER_SIZE)]
 
 
 @lru_cache(maxsize=1)
@@ -14,7 +30,8 @@ def random_useragent():
 
 @lru_cache(maxsize=1)
 def wencai_session():
-    return requests.Session()
+    # i问财接口为HTTP明文接口，不支持HTTP/2
+    return get_transport_config().create_session(http2=False)
 
 
 class DeviceInfo:
@@ -52,11 +69,7 @@ class DeviceInfo:
 
     def _str_hash(self, s):
         """字符串哈希"""
-        c = 0
-        for v in range(len(s)):
-            c = (c << 5) - c + ord(s[v])
-            c = c & 0xFFFFFFFF  # JavaScript的 >>>= 0 操作
-        return c
+        return _str_hash(s)
 
     def update_behavior_data(self):
         """更新用户行为数据"""
@@ -116,11 +129,50 @@ class DeviceInfo:
 
         return buffer
 
+    def to_bytes(self):
+        """使用预编译的struct格式打包设备信息，结果与to_buffer相同"""
+        return BUFFER_STRUCT.pack(
+            self.random_id, self.server_time, self.client_time, self.user_agent_hash,
+            self.platform, self.browser_index, self.plugin_num,
+            (self.mouse_moves >> 16) & 0xFF, self.mouse_moves & 0xFFFF,
+            self.mouse_clicks, self.mouse_scrolls, self.key_presses, self.mouse_x, self.mouse_y,
+            self.browser_feature, self.reserved1, self.reserved2, self.counter, self.version
+        )
+
+
+@lru_cache(maxsize=16)
+def _str_hash(s):
+    """字符串哈希，同一User-Agent只计算一次"""
+    c = 0
+    for v in range(len(s)):
+        c = (c << 5) - c + ord(s[v])
+        c = c & 0xFFFFFFFF  # JavaScript的 >>>= 0 操作
+    return c
+
+
+@lru_cache(maxsize=256)
+def _xor_mask(key):
+    """编码密钥序列只由初始密钥决定，预先生成整个缓冲区的异或掩码"""
+    mask = bytearray(BUFFER_SIZE)
+    for i in range(BUFFER_SIZE):
+        mask[i] = key & 255
+        key = ~(key * 131) & 0xFFFFFFFF
+    return int.from_bytes(mask, 'big')
+
+
+def encode_buffer(buffer):
+    """编码设备信息缓冲区，生成hexin-v令牌"""
+    key = sum(map(int.__mul__, buffer, _HASH_WEIGHTS)) & 255
+    encoded = (int.from_bytes(buffer, 'big') ^ _xor_mask(key)).to_bytes(BUFFER_SIZE, 'big')
+    return base64.urlsafe_b64encode(bytes((3, key)) + encoded).decode()
 
 
 class TokenGenerator:
+    """hexin-v令牌生成器，多个线程共用时按顺序更新设备信息，计数器不会重复或交错"""
+
     def __init__(self, user_agent=None):
         self.device = DeviceInfo(user_agent)
+        self._lock = threading.Lock()
 
     def simple_hash(self, data):
         """简单哈希函数 - 支持bytes/bytearray"""
@@ -131,30 +183,107 @@ class TokenGenerator:
 
     def update(self):
         """更新token"""
-        # 更新设备行为数据
-        self.device.update_behavior_data()
+        # 更新设备行为数据并打包为字节，加锁保证每个令牌对应一次完整的更新
+        with self._lock:
+            self.device.update_behavior_data()
+            buffer = self.device.to_bytes()
+
+        # 编码不访问共享状态，在锁外执行
+        return encode_buffer(buffer)
+
+
+class TokenPool:
+    """
+    后台预生成的hexin-v令牌池
+
+    后台线程保持池中有size个令牌，请求时直接取出，生成令牌不占用请求的关键路径。
+    超过max_age秒的令牌丢弃，池为空时当场生成
+    """
+
+    def __init__(self, user_agent=None, size=8, max_age=5.0):
+        self.generator = TokenGenerator(user_agent)
+        self.max_age = max_age
+        self._queue = queue.Queue(maxsize=size)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._refill, name='emxg-token-pool', daemon=True)
+        self._thread.start()
+
+    def _refill(self):
+        while not self._closed.is_set():
+            item = (time.monotonic(), self.generator.update())
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    pass
+
+    def get(self):
+        """取出一个未过期的令牌"""
+        deadline = time.monotonic() - self.max_age
+        while True:
+            try:
+                created, token = self._queue.get_nowait()
+            except queue.Empty:
+                return self.generator.update()
+            if created >= deadline:
+                return token
+
+    def close(self):
+        """停止后台线程"""
+        self._closed.set()
+        self._thread.join()
+
+
+_pool_size = 0
+_pool_max_age = 5.0
+_token_pools: Dict[Optional[str], TokenPool] = {}
+_pools_lock = threading.Lock()
+
+
+def set_token_pool(size=8, max_age=5.0):
+    """
+    开启或关闭后台令牌池
+
+    Args:
+        size: 每个User-Agent预生成的令牌数，0表示关闭
+        max_age: 令牌在池中的最长保留时间（秒）
+    """
+    global _pool_size, _pool_max_age
+    with _pools_lock:
+        _pool_size, _pool_max_age = size, max_age
+        pools = list(_token_pools.values())
+        _token_pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _get_token_pool(user_agent):
+    with _pools_lock:
+        pool = _token_pools.get(user_agent)
+        if pool is None:
+            pool = _token_pools[user_agent] = TokenPool(user_agent, _pool_size, _pool_max_age)
+        return pool
 
-        # 转换为字节数组并编码
-        buffer = self.device.to_buffer()
 
-        # 编码数据
-        key = self.simple_hash(buffer)
-        dst = bytearray([3, key])
+@lru_cache(maxsize=1)
+def _cached_token_generator(user_agent):
+    return TokenGenerator(user_agent)
 
-        for byte_value in buffer:
-            dst.append(byte_value ^ (key & 255))
-            key = ~(key * 131) & 0xFFFFFFFF
 
-        return base64.urlsafe_b64encode(dst).decode()
+_generator_lock = threading.Lock()
 
 
-@lru_cache(maxsize=1)
 def get_token_generator(user_agent=None):
-    return TokenGenerator(user_agent)
+    '''获取共用的令牌生成器，加锁避免多个线程同时创建出不同的实例'''
+    with _generator_lock:
+        return _cached_token_generator(user_agent)
 
 
 def get_token(user_agent):
-    '''获取token'''
+    '''获取token，开启令牌池时从池中取出'''
+    if _pool_size > 0:
+        return _get_token_pool(user_agent).get()
     return get_token_generator(user_agent).update()
 
 
@@ -166,3 +295,21 @@ def wencai_headers(user_agent=None):
         'hexin-v': get_token(user_agent),
         'User-Agent': user_agent,
     }
+
+
+def _reinit_after_fork():
+    """
+    子进程中重新初始化令牌状态
+
+    fork时其他线程可能正持有锁，后台线程也不会复制到子进程；子进程丢弃继承的生成器和令牌池，
+    首次使用时重新创建，避免与父进程共用设备ID、计数器和已生成的令牌
+    """
+    global _pools_lock, _generator_lock
+    _pools_lock = threading.Lock()
+    _generator_lock = threading.Lock()
+    _token_pools.clear()
+    _cached_token_generator.cache_clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
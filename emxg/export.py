@@ -0,0 +1,210 @@
+"""
+结果导出
+逐页写出查询结果，支持 CSV、Excel（openpyxl只写模式）、Parquet 和 Feather，内存占用只与单页大小有关
+"""
+
+import csv
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .data_adapter import BACKEND, DataFrame, column_names, iter_tuples, to_records
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+logger = logging.getLogger(__package__)
+
+# 文件扩展名对应的导出格式
+FORMATS = {
+    '.csv': 'csv',
+    '.xlsx': 'excel',
+    '.parquet': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+}
+
+
+def _missing_values() -> Tuple[Any, ...]:
+    """各后端表示缺失值的特殊对象"""
+    if BACKEND == "pandas":
+        import pandas as pd
+        return (pd.NA, pd.NaT)
+    return ()
+
+
+def _page_rows(page: DataFrame, header: List[str]) -> Iterator[Sequence[Any]]:
+    """按表头的列顺序逐行产出页面数据"""
+    if column_names(page) == header:
+        return iter_tuples(page)
+    return ([row.get(name) for name in header] for row in to_records(page))
+
+
+def _iter_rows(pages: Iterable[DataFrame], missing: Any) -> Iterator[Sequence[Any]]:
+    """逐行产出所有页面的数据，第一行为表头，缺失值（None、NaN等）统一替换为missing"""
+    special = _missing_values()
+
+    def is_missing(v: Any) -> bool:
+        return v is None or (isinstance(v, float) and v != v) or any(v is s for s in special)
+
+    header = None
+    for page in pages:
+        if header is None:
+            header = column_names(page)
+            yield header
+        for row in _page_rows(page, header):
+            yield [missing if is_missing(v) else v for v in row]
+
+
+def _write_csv(pages: Iterable[DataFrame], path: str, encoding: str) -> int:
+    rows = _iter_rows(pages, '')
+    count = 0
+    with open(path, 'w', newline='', encoding=encoding) as f:
+        writer = csv.writer(f)
+        header = next(rows, None)
+        if header is not None:
+            writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_excel(pages: Iterable[DataFrame], path: str, sheet_name: str) -> int:
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("请安装 openpyxl 库以支持 Excel 导出: pip install openpyxl")
+
+    # 只写模式逐行写出，不在内存中保留整个工作表
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    count = 0
+    rows = _iter_rows(pages, None)
+    header = next(rows, None)
+    if header is not None:
+        ws.append(header)
+    for row in rows:
+        ws.append(row)
+        count += 1
+    wb.save(path)
+    return count
+
+
+def _to_arrow(page: DataFrame) -> 'pa.Table':
+    """转换为pyarrow.Table"""
+    import pyarrow as pa
+    from .arrow_adapter import create_frame
+
+    if isinstance(page, pa.Table):
+        return page
+    if BACKEND == "polars":
+        return page.to_arrow()
+    if BACKEND == "pandas":
+        try:
+            return pa.Table.from_pandas(page, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # 含有混合类型的object列，按列构建并把这些列保存为字符串
+            pass
+    return create_frame(to_records(page))
+
+
+def _conform(table: 'pa.Table', schema: 'pa.Schema') -> 'pa.Table':
+    """把页面转换为首页的表结构，数值列中无法解析的值为空值"""
+    import pyarrow as pa
+    from .arrow_adapter import convert_number_column
+
+    arrays = []
+    for field in schema:
+        if field.name not in table.column_names:
+            arrays.append(pa.nulls(len(table), field.type))
+            continue
+        column = table.column(field.name)
+        if column.type != field.type:
+            if pa.types.is_floating(field.type) and (pa.types.is_string(column.type)
+                                                     or pa.types.is_large_string(column.type)):
+                column = convert_number_column(column)
+            column = column.cast(field.type)
+        arrays.append(column)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_arrow(pages: Iterable[DataFrame], path: str, fmt: str, compression: Optional[str]) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError(f"请安装 pyarrow 库以支持 {fmt} 导出: pip install pyarrow")
+
+    writer = None
+    schema = None
+    count = 0
+    try:
+        for page in pages:
+            table = _to_arrow(page)
+            if writer is None:
+                # 首页全部为空值的列按字符串保存，以便容纳后续页面的数据
+                schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                    for field in table.schema]).remove_metadata()
+                if fmt == 'parquet':
+                    writer = pq.ParquetWriter(path, schema, compression=compression or 'snappy')
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=compression)
+                    writer = pa.ipc.new_file(path, schema, options=options)
+            writer.write_table(_conform(table, schema))
+            count += len(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def export_pages(pages: Iterable[DataFrame],
+                 path: str,
+                 format: Optional[str] = None,
+                 encoding: str = 'utf-8-sig',
+                 sheet_name: str = 'Sheet1',
+                 compression: Optional[str] = None) -> int:
+    """
+    逐页写出查询结果
+
+    页面通常来自iter_pages，每获取一页即写入文件，所有页面沿用首页的列。
+    先写入临时文件，全部写完后再替换目标文件，失败时不会留下不完整的文件
+
+    Args:
+        pages: DataFrame页面的可迭代对象
+        path: 输出文件路径
+        format: 导出格式 csv、excel、parquet 或 feather，None表示按扩展名判断
+        encoding: CSV文件编码，默认带BOM的UTF-8以便Excel直接打开
+        sheet_name: Excel工作表名称
+        compression: Parquet/Feather压缩算法，Parquet默认snappy，Feather默认不压缩
+
+    Returns:
+        int: 写出的数据行数
+    """
+    fmt = format or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"不支持的导出格式: {format or path}，可选: csv、excel、parquet、feather")
+
+    tmp_path = f"{path}.tmp"
+    try:
+        if fmt == 'csv':
+            count = _write_csv(pages, tmp_path, encoding)
+        elif fmt == 'excel':
+            count = _write_excel(pages, tmp_path, sheet_name)
+        else:
+            count = _write_arrow(pages, tmp_path, fmt, compression)
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    logger.info(f"已导出{count}条数据到{path}")
+    return count
+
+
+def export_frame(df: DataFrame, path: str, **kwargs: Any) -> int:
+    """写出单个DataFrame，参数同export_pages"""
+    return export_pages([df], path, **kwargs)
@@ -0,0 +1,57 @@
+"""
+JSON解码
+直接解析响应的原始字节，安装了 orjson 或 pysimdjson 时优先使用，否则使用标准库json
+"""
+
+import importlib.util
+import json
+import logging
+from typing import Any, Callable, Optional, Tuple, Union
+
+
+logger = logging.getLogger(__package__)
+
+Decoder = Callable[[Union[bytes, str]], Any]
+
+
+def _detect_decoder() -> Tuple[str, Decoder]:
+    """按 orjson、simdjson、json 的顺序选择已安装的解码器"""
+    if importlib.util.find_spec("orjson") is not None:
+        import orjson
+        return "orjson", orjson.loads
+    if importlib.util.find_spec("simdjson") is not None:
+        import simdjson
+        return "simdjson", simdjson.loads
+    return "json", json.loads
+
+
+_name, _decoder = _detect_decoder()
+
+
+def set_json_decoder(decoder: Optional[Decoder]) -> None:
+    """设置解析响应使用的JSON解码函数，需接受bytes和str，None表示恢复自动选择"""
+    global _name, _decoder
+    if decoder is None:
+        _name, _decoder = _detect_decoder()
+    else:
+        _name, _decoder = getattr(decoder, "__module__", None) or "custom", decoder
+
+
+def get_json_decoder() -> str:
+    """返回当前使用的解码器名称"""
+    return _name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    解析JSON
+
+    快速解码器不支持的写法（如NaN、超出64位的整数）回退到标准库json解析
+    """
+    try:
+        return _decoder(data)
+    except ValueError:
+        if _decoder is json.loads:
+            raise
+        logger.debug(f"{_name}解析失败，使用json重试")
+        return json.loads(data)
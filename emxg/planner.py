@@ -0,0 +1,71 @@
+"""
+分页请求计划
+根据max_count/max_page和接口单页上限计算每页数量和页数，使每次查询只请求需要的数据
+"""
+
+import math
+from typing import Optional
+
+
+# 东方财富条件选股单页数量上限
+EM_PAGE_SIZE = 50
+# i问财单页数量上限
+WENCAI_PAGE_SIZE = 100
+
+
+class PagePlan:
+    """分页请求计划"""
+
+    def __init__(self, page_size: int, page_count: Optional[int] = None, limit: Optional[int] = None):
+        """
+        Args:
+            page_size: 每页数量
+            page_count: 最多请求的页数，None表示直到取完
+            limit: 最多返回的数据条数，None表示不限制，最后一页超出部分被截断
+        """
+        self.page_size = page_size
+        self.page_count = page_count
+        self.limit = limit
+
+    def __repr__(self) -> str:
+        return f"PagePlan(page_size={self.page_size}, page_count={self.page_count}, limit={self.limit})"
+
+    def pages_for_total(self, total: int) -> int:
+        """已知总条数时需要请求的页数"""
+        pages = math.ceil(total / self.page_size)
+        if self.page_count is not None:
+            pages = min(pages, self.page_count)
+        return pages
+
+    def remaining(self, fetched: int) -> Optional[int]:
+        """已获取fetched条后还需要的条数，None表示不限制"""
+        if self.limit is None:
+            return None
+        return max(0, self.limit - fetched)
+
+
+def plan_pages(max_count: Optional[int] = None,
+               max_page: Optional[int] = None,
+               max_page_size: int = EM_PAGE_SIZE) -> PagePlan:
+    """
+    计算最少请求次数的分页计划
+
+    限制条数时先按单页上限确定最少页数，再把条数平均分到各页，使最后一页尽量不多取，
+    例如 max_count=120、单页上限50 时请求3页、每页40条
+
+    Args:
+        max_count: 最大返回数据条数，None表示不限制
+        max_page: 最大页数，None表示不限制
+        max_page_size: 接口单页数量上限
+
+    Returns:
+        PagePlan: 分页计划
+    """
+    if not max_count:
+        return PagePlan(max_page_size, max_page or None)
+
+    page_count = math.ceil(max_count / max_page_size)
+    if max_page:
+        page_count = min(page_count, max_page)
+    page_size = min(max_page_size, math.ceil(max_count / page_count))
+    return PagePlan(page_size, page_count, max_count)
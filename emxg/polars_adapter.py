@@ -0,0 +1,114 @@
+"""
+基于 polars 的数据处理实现
+直接由分页数据构建 polars.DataFrame，数值解析使用 polars 表达式
+"""
+
+import inspect
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import polars as pl
+
+from .data_adapter import BOOL_TRUE_VALUES, CATEGORY_RATIO
+
+
+DataFrame = pl.DataFrame
+
+# 较早的polars版本round不支持mode参数，默认即为.5时远离零舍入；新版本默认改为银行家舍入
+ROUND_KWARGS = {'mode': 'half_away_from_zero'} if 'mode' in inspect.signature(pl.Expr.round).parameters else {}
+
+
+def create_frame(data: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> DataFrame:
+    """由字典列表按列构建polars.DataFrame，混合类型的列取公共类型（通常为字符串）"""
+    names = columns if columns is not None else list(dict.fromkeys(key for row in data for key in row))
+    return pl.DataFrame([pl.Series(name, [row.get(name) for row in data], strict=False) for name in names])
+
+
+def rename_columns(df: DataFrame, mapping: Dict[str, str]) -> DataFrame:
+    """按映射重命名列"""
+    return df.rename(mapping)
+
+
+def concat(dfs: List[DataFrame], ignore_index=True) -> DataFrame:
+    """连接多个DataFrame，缺失的列补空值"""
+    return pl.concat(dfs, how="diagonal_relaxed")
+
+
+def column_names(df: DataFrame) -> List[str]:
+    """返回列名列表"""
+    return list(df.columns)
+
+
+def head(df: DataFrame, n: int) -> DataFrame:
+    """返回前n行"""
+    return df.head(n)
+
+
+def to_records(df: DataFrame) -> List[Dict[str, Any]]:
+    """转换为字典列表"""
+    return df.to_dicts()
+
+
+def iter_tuples(df: DataFrame) -> Iterator[Tuple[Any, ...]]:
+    """逐行产出值元组，顺序同column_names"""
+    return df.iter_rows()
+
+
+def number_expr(col_name: str, dtype: pl.DataType, strip: str = '') -> Optional[pl.Expr]:
+    """数值列转换表达式，支持"亿"/"万"单位，无法解析的值为空值；不支持的列类型返回None"""
+    column = pl.col(col_name)
+    if dtype.is_numeric() or dtype == pl.Null:
+        return column.cast(pl.Float64)
+    if dtype != pl.String:
+        return None
+
+    text = column.str.strip_chars()
+    if strip:
+        text = text.str.replace_all(strip, '', literal=True).str.strip_chars()
+    has_yi = text.str.contains('亿', literal=True)
+    has_wan = text.str.contains('万', literal=True)
+    digits = (pl.when(has_yi).then(text.str.replace_all('亿', '', literal=True))
+              .when(has_wan).then(text.str.replace_all('万', '', literal=True))
+              .otherwise(text))
+    scale = pl.when(has_yi).then(100000000.0).when(has_wan).then(10000.0).otherwise(1.0)
+    return digits.cast(pl.Float64, strict=False) * scale
+
+
+def convert_columns(df: DataFrame, conversions: List[Tuple[str, str]], processor: Any = None) -> DataFrame:
+    """使用polars表达式按列转换数据类型，conversions为(列名, 转换类型)列表，类型为number/percent/bool"""
+    exprs = {}
+    for col_name, kind in conversions:
+        dtype = df.schema[col_name]
+        if kind in ('number', 'percent'):
+            expr = number_expr(col_name, dtype, strip='%' if kind == 'percent' else '')
+            if expr is not None and kind == 'percent':
+                # .5时远离零舍入，与内置round对常见百分比的结果一致
+                expr = (expr / 100).round(4, **ROUND_KWARGS)
+        elif kind == 'bool':
+            expr = (pl.col(col_name).cast(pl.String, strict=False).str.strip_chars()
+                    .is_in(BOOL_TRUE_VALUES).fill_null(False))
+        else:
+            expr = None
+        if expr is not None:
+            exprs[col_name] = expr.alias(col_name)
+
+    if not exprs:
+        return df
+    return df.with_columns(list(exprs.values()))
+
+
+def compact_frame(df: DataFrame, downcast: bool = False) -> Tuple[DataFrame, Dict[str, Tuple[int, int]]]:
+    """
+    压缩列存储，返回压缩后的DataFrame和各列压缩前后的内存占用(字节)
+
+    低基数的字符串列转为Categorical，downcast为True时Float64降为Float32
+    """
+    exprs = []
+    for name, dtype in df.schema.items():
+        if downcast and dtype == pl.Float64:
+            exprs.append(pl.col(name).cast(pl.Float32))
+        elif dtype == pl.String and len(df) and df[name].n_unique() <= len(df) * CATEGORY_RATIO:
+            exprs.append(pl.col(name).cast(pl.Categorical))
+
+    compacted = df.with_columns(exprs) if exprs else df
+    report = {name: (df[name].estimated_size(), compacted[name].estimated_size()) for name in df.columns}
+    return compacted, report
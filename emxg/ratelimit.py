@@ -0,0 +1,140 @@
+"""
+客户端请求限流
+令牌桶算法，可按数据源分别设置速率，并可通过文件在同一主机的多个进程间共享额度
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+logger = logging.getLogger(__package__)
+
+
+class RateLimiter:
+    """进程内令牌桶限流器，线程安全"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数，即长期平均请求速率
+            burst: 令牌桶容量，即允许的最大突发请求数，默认为max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError(f"rate必须大于0: {rate}")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        """按经过的时间补充令牌"""
+        return min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        预占令牌，返回需要等待的秒数
+
+        令牌不足时余额记为负数，后续请求依次排队，等待时间由欠下的令牌数决定
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = self._refill(self._tokens, self._updated, now) - tokens
+            self._updated = now
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """获取令牌，不足时阻塞等待"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"限流等待{wait:.3f}秒")
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        """异步获取令牌，不足时挂起等待"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"限流等待{wait:.3f}秒")
+            await asyncio.sleep(wait)
+
+
+@contextmanager
+def _locked_file(path: str) -> Iterator[int]:
+    """打开并独占锁定文件"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield fd
+    finally:
+        # 关闭文件描述符时自动释放锁
+        os.close(fd)
+
+
+class FileRateLimiter(RateLimiter):
+    """基于文件锁的令牌桶限流器，同一主机上使用相同文件的所有进程共享额度"""
+
+    def __init__(self, path: str, rate: float, burst: Optional[float] = None):
+        """
+        Args:
+            path: 保存令牌桶状态的文件路径
+            rate: 每秒补充的令牌数
+            burst: 令牌桶容量
+        """
+        super().__init__(rate, burst)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def reserve(self, tokens: float = 1) -> float:
+        with self._lock, _locked_file(self.path) as fd:
+            now = time.time()
+            try:
+                state = os.read(fd, 64).decode().split()
+                current = self._refill(float(state[0]), float(state[1]), now)
+            except (ValueError, IndexError):
+                current = self.burst
+            current -= tokens
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{current} {now}".encode())
+            return max(0.0, -current / self.rate)
+
+
+# 各数据源的限流器，数据源名称为 "emxg" 或 "wencai"
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def set_rate_limiter(provider: str, limiter: Optional[RateLimiter]) -> None:
+    """设置数据源的限流器，None表示不限流"""
+    if limiter is None:
+        _limiters.pop(provider, None)
+    else:
+        _limiters[provider] = limiter
+
+
+def get_rate_limiter(provider: str) -> Optional[RateLimiter]:
+    """获取数据源的限流器"""
+    return _limiters.get(provider)
+
+
+def throttle(provider: str) -> None:
+    """发送请求前调用，数据源设置了限流器时按其速率等待"""
+    limiter = _limiters.get(provider)
+    if limiter is not None:
+        limiter.acquire()
+
+
+async def athrottle(provider: str) -> None:
+    """throttle的异步版本"""
+    limiter = _limiters.get(provider)
+    if limiter is not None:
+        await limiter.acquire_async()
@@ -0,0 +1,114 @@
+"""
+HTTP传输层配置
+统一创建东方财富和i问财使用的会话，支持连接池、长连接、socket选项和可选的HTTP/2
+"""
+
+import logging
+import socket
+from typing import Any, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+
+logger = logging.getLogger(__package__)
+
+
+class _TransportAdapter(HTTPAdapter):
+    """支持自定义socket选项的HTTPAdapter"""
+
+    def __init__(self, socket_options: Optional[List[Tuple[int, int, int]]] = None, **kwargs: Any):
+        # HTTPAdapter.__init__ 中会调用 init_poolmanager，需先设置socket选项
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class TransportConfig:
+    """HTTP传输层配置"""
+
+    def __init__(self,
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 pool_block: bool = False,
+                 keep_alive: bool = True,
+                 socket_options: Optional[List[Tuple[int, int, int]]] = None,
+                 http2: bool = False):
+        """
+        Args:
+            pool_connections: 缓存的主机连接池数量
+            pool_maxsize: 每个主机连接池的最大连接数，并发请求数超过此值时多余的连接用完即关闭
+            pool_block: 每个主机的连接数达到pool_maxsize时是否阻塞等待，用于严格限制单主机连接数
+            keep_alive: 是否复用连接，开启时同时设置TCP keepalive
+            socket_options: 额外的socket选项，如[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+            http2: 是否使用HTTP/2（需要安装 httpx[http2]，仅对HTTPS接口生效）
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.socket_options = socket_options or []
+        self.http2 = http2
+
+    def _socket_options(self) -> List[Tuple[int, int, int]]:
+        """合并urllib3默认选项、keepalive和自定义选项"""
+        options = list(HTTPConnection.default_socket_options)
+        if self.keep_alive:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        return options + [opt for opt in self.socket_options if opt not in options]
+
+    def create_session(self, http2: Optional[bool] = None) -> Any:
+        """
+        按配置创建会话
+
+        Args:
+            http2: 覆盖配置中的http2选项，对仅支持HTTP/1.1的接口传入False
+
+        Returns:
+            requests.Session，开启HTTP/2时返回接口兼容的httpx.Client
+        """
+        if self.http2 if http2 is None else http2:
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError("请安装 httpx 库以支持 HTTP/2: pip install httpx[http2]")
+            return httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=self.pool_maxsize,
+                                    max_keepalive_connections=self.pool_maxsize if self.keep_alive else 0)
+            )
+
+        session = requests.Session()
+        adapter = _TransportAdapter(
+            socket_options=self._socket_options(),
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+
+_transport_config = TransportConfig()
+
+
+def set_transport_config(config: TransportConfig) -> None:
+    """设置默认传输层配置，之后创建的客户端和i问财共享会话将使用新配置"""
+    global _transport_config
+    _transport_config = config
+    # 延迟导入，避免循环依赖
+    from .device_info import wencai_session
+    wencai_session.cache_clear()
+
+
+def get_transport_config() -> TransportConfig:
+    """获取默认传输层配置"""
+    return _transport_config
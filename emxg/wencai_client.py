@@ -1,42 +1,44 @@
+import asyncio
 import logging
 import requests
 import json
 import math
 import pydash as _
-from typing import List, Dict, Any, Optional, Union
-from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_exponential
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+from tenacity import AsyncRetrying, Retrying, retry, stop_after_attempt, retry_if_exception, retry_if_exception_type, wait_exponential
+from functools import lru_cache, partial
 from traceback import format_exc
-from .data_adapter import DataFrame, concat, DataProcessor
+from weakref import WeakKeyDictionary
+from .aio import AsyncSessionClient, loop_local
+from .batch import run_batch
+from .cache import ResponseCache, get_default_cache, get_default_robot_cache
+from .data_adapter import DataFrame, concat, head, DataProcessor
 from .device_info import wencai_session, wencai_headers, random_useragent
+from .fastjson import loads
+from .planner import WENCAI_PAGE_SIZE, plan_pages
+from .ratelimit import throttle, athrottle
+from .singleflight import SingleFlight
 from .wencai_converter import parse_url_params, xuangu_tableV1_handler, multi_show_type_handler
 
 
 logger = logging.getLogger(__package__)
 
+ROBOT_DATA_URL = 'http://www.iwencai.com/customized/chart/get-robot-data'
+DATA_LIST_URL = 'http://www.iwencai.com/gateway/urp/v7/landing/getDataList'
+FIND_URL = 'http://www.iwencai.com/unifiedwap/unified-wap/v2/stock-pick/find'
 
-class WencaiStockClient:
-    ''' iWencai条件选股查询客户端
-    '''
-    def __init__(self):
-        self.session = wencai_session()
-        self.data_processor = DataProcessor()
+# 并行分页时每页默认的重试次数，与post自带的重试一样每页最多请求5次
+PAGE_RETRIES = 4
 
-    @retry(
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        stop=stop_after_attempt(5),
-        retry=retry_if_exception_type((requests.Timeout, requests.HTTPError, requests.ConnectionError))
-    )
-    def post(self, url, json=None, data=None, headers=None, **kwargs):
-        if json is not None:
-            return self.session.post(url, json=json, headers=headers, **kwargs)
-        return self.session.post(url, data=data, headers=headers, **kwargs)
 
-    def get_robot_data(self, **kwargs):
+class WencaiRequestMixin:
+    ''' 同步和异步i问财客户端共用的请求构建、响应解析和问句解析缓存，使用方需提供robot_cache属性
+    '''
+    def _robot_request(self, **kwargs):
+        '''构建get_robot_data请求，返回(url, 请求数据)'''
         question = kwargs.get('query')
         query_type = kwargs.get('query_type', 'stock')
-        user_agent = kwargs.get('user_agent', None)
-        request_params = kwargs.get('request_params', {})
         data = {
             'add_info': "{\"urp\":{\"scene\":1,\"company\":1,\"business\":1},\"contentType\":\"json\",\"searchInfo\":true}",
             'perpage': '10',
@@ -53,35 +55,50 @@ class WencaiStockClient:
         if pro:
             data['iwcpro'] = 1
 
-        logger.debug(f'获取condition开始')
+        return ROBOT_DATA_URL, data
 
-        result = self.post(
-            'http://www.iwencai.com/customized/chart/get-robot-data',
-            json=data, headers=wencai_headers(user_agent), **request_params)
-        result = self.convert(result)
+    def _robot_cache(self):
+        return self.robot_cache or get_default_robot_cache()
 
-        if result:
-            logger.debug(f'获取get_robot_data成功')
-        else:
-            logger.info(f'获取get_robot_data失败')
+    def _robot_cache_key(self, cache, kwargs):
+        '''问句解析结果只与问句、查询类型和是否专业版有关'''
+        return cache.make_key('wencai-robot', kwargs.get('query'),
+                              query_type=kwargs.get('query_type', 'stock'), pro=kwargs.get('pro', False))
 
-        return result
+    def _load_robot_data(self, kwargs):
+        '''读取缓存的问句解析结果，未命中返回None'''
+        cache = self._robot_cache()
+        if cache is None:
+            return None
+        params = cache.get(self._robot_cache_key(cache, kwargs))
+        if params is not None:
+            logger.debug(f'命中查询条件缓存: {kwargs.get("query")}')
+        return params
 
-    def get_page(self, url_params, **kwargs):
-        '''获取每页数据'''
-        user_agent = kwargs.get('user_agent', None)
+    def _store_robot_data(self, kwargs, params):
+        '''缓存表格结果的问句解析结果，非表格结果本身就是查询结果，不缓存'''
+        cache = self._robot_cache()
+        if cache is not None and params and params.get('data', {}).get('condition') is not None:
+            cache.set(self._robot_cache_key(cache, kwargs), params)
+
+    def _drop_robot_data(self, kwargs):
+        cache = self._robot_cache()
+        if cache is not None:
+            cache.delete(self._robot_cache_key(cache, kwargs))
+
+    def _page_request(self, url_params, **kwargs):
+        '''构建一页数据的请求，返回(url, 请求数据, 数据路径, 列定义路径)'''
         find = kwargs.pop('find', None)
         query_type = kwargs.get('query_type', 'stock')
-        request_params = kwargs.get('request_params', {})
         pro = kwargs.get('pro', False)
         if find is None:
             data = {
                 **url_params,
-                'perpage': 100,
+                'perpage': WENCAI_PAGE_SIZE,
                 'page': 1,
                 **kwargs
             }
-            target_url = 'http://www.iwencai.com/gateway/urp/v7/landing/getDataList'
+            target_url = DATA_LIST_URL
             if pro:
                 target_url = f'{target_url}?iwcpro=1'
             path = 'answer.components.0.data.datas'
@@ -92,63 +109,44 @@ class WencaiStockClient:
                 find = ','.join(find)
             data = {
                 **url_params,
-                'perpage': 100,
+                'perpage': WENCAI_PAGE_SIZE,
                 'page': 1,
                 'query_type': query_type,
                 'question': find,
                 **kwargs
             }
-            target_url = 'http://www.iwencai.com/unifiedwap/unified-wap/v2/stock-pick/find'
+            target_url = FIND_URL
             path = 'data.data.datas'
             colpath = 'data.data.columns'
+        return target_url, data, path, colpath
 
-        logger.debug(f'第{data.get("page")}页开始')
-
-        request_params['timeout'] = (5, 10)
-        res = self.post(target_url, data=data, headers=wencai_headers(user_agent), **request_params)
-        result = json.loads(res.text)
+    def _parse_page(self, content, data, path, colpath):
+        '''解析一页响应，返回(页码, 数据列表, 列定义)，数据为空时抛出异常'''
+        result = loads(content)
         data_list = _.get(result, path)
         columns = _.get(result, colpath)
         if len(data_list) > 0:
             logger.debug(f'第{data.get("page")}页成功')
-            result = self.data_processor.process_data(data_list, columns)
         else:
             logger.error(f'第{data.get("page")}页返回空！')
             raise Exception("data_list is empty!")
 
-        if result is None:
-            logger.error(f'第{data.get("page")}页失败')
-
-        return result
+        return data.get('page'), data_list, columns
 
-    def loop_page(self, loop, row_count, url_params, **kwargs):
-        '''循环分页'''
-        count = 0
-        perpage = kwargs.pop('perpage', 100)
+    def _page_numbers(self, loop, row_count, kwargs):
+        '''计算需要获取的页码，kwargs中补充默认的perpage和page'''
+        perpage = kwargs.setdefault('perpage', WENCAI_PAGE_SIZE)
         max_page = math.ceil(row_count / perpage)
-        result = None
-        if 'page' not in kwargs:
-            kwargs['page'] = 1
-        initPage = kwargs['page']
-        loop_count = max_page if loop is True else loop
-        while count < loop_count:
-            kwargs['page'] = initPage + count
-            resultPage = self.get_page(url_params, **kwargs)
-            count = count + 1
-            if result is None:
-                result = resultPage
-            else:
-                result = concat([result, resultPage], ignore_index=True)
+        init_page = kwargs.setdefault('page', 1)
+        loop_count = max_page if loop is True else min(loop, max_page)
+        return range(init_page, init_page + max(loop_count, 0))
 
-        return result
-
-    def convert(self, res):
-        '''处理get_robot_data的结果'''
-        logger.debug(res.text)
-        result = json.loads(res.text)
+    def _parse_robot_data(self, body):
+        '''解析get_robot_data的响应体'''
+        result = loads(body)
         content = _.get(result, 'data.answer.0.txt.0.content')
         if type(content) == str:
-            content = json.loads(content)
+            content = loads(content)
         components = content['components']
         params = {}
 
@@ -168,26 +166,312 @@ class WencaiStockClient:
             }
         return params
 
-    def search(self, loop=False, **kwargs):
-        params = self.get_robot_data(**kwargs)
+    def _query_request(self, params, loop, kwargs, **loop_options):
+        '''
+        根据问句解析结果选择取数请求，返回(请求方法, 位置参数, 关键字参数)，无查询条件时返回None
+
+        同步和异步客户端的loop_page/get_page参数一致，两者只在实际请求分页时不同；
+        loop_options为逐页获取时额外传给loop_page的参数
+        '''
         data = params.get('data')
+        if data.get('condition', None) is None:
+            return None
+        kwargs = {**kwargs, **data}
         url_params = params.get('url_params')
-        condition = data.get('condition', None)
-
-        if condition is not None:
-            kwargs = {**kwargs, **data}
-            find = kwargs.get('find', None)
-            if loop and find is None:
-                row_count = params.get('row_count')
-                return self.loop_page(loop, row_count, url_params, **kwargs)
-            else:
-                return self.get_page(url_params, **kwargs)
+        if loop and kwargs.get('find', None) is None:
+            return self.loop_page, (loop, params.get('row_count'), url_params), {**loop_options, **kwargs}
+        return self.get_page, (url_params,), kwargs
+
+    def _detail_result(self, params, kwargs):
+        '''无查询条件时的结果：返回问句解析数据，no_detail时返回None'''
+        return None if kwargs.get('no_detail') else params.get('data')
+
+    def _limit_rows(self, result, limit):
+        '''表格结果截取前limit行'''
+        if limit is not None and result is not None and len(result) > limit:
+            result = head(result, limit)
+        return result
+
+
+class WencaiStockClient(WencaiRequestMixin):
+    ''' iWencai条件选股查询客户端
+    '''
+    def __init__(self, cache: Optional[ResponseCache] = None, robot_cache: Optional[ResponseCache] = None,
+                 page_backoff: float = 1):
+        '''
+        Args:
+            cache: 查询结果缓存，None表示使用get_default_cache()返回的默认缓存
+            robot_cache: 问句解析结果（condition、comp_id、uuid、url_params）的缓存，命中时直接请求分页数据，
+                None表示使用get_default_robot_cache()返回的默认缓存
+            page_backoff: 并行分页重试等待时间的倍数，1表示与post相同的4~10秒指数退避
+        '''
+        self.session = wencai_session()
+        self.data_processor = DataProcessor()
+        self.cache = cache
+        self.robot_cache = robot_cache
+        self.page_backoff = page_backoff
+        self._single_flight = SingleFlight()
+
+    @retry(
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        stop=stop_after_attempt(5),
+        retry=retry_if_exception_type((requests.Timeout, requests.HTTPError, requests.ConnectionError))
+    )
+    def post(self, url, json=None, data=None, headers=None, **kwargs):
+        throttle('wencai')
+        if json is not None:
+            return self.session.post(url, json=json, headers=headers, **kwargs)
+        return self.session.post(url, data=data, headers=headers, **kwargs)
+
+    def get_robot_data(self, **kwargs):
+        user_agent = kwargs.get('user_agent', None)
+        request_params = kwargs.get('request_params', {})
+        url, data = self._robot_request(**kwargs)
+
+        logger.debug('获取condition开始')
+
+        result = self.post(url, json=data, headers=wencai_headers(user_agent), **request_params)
+        result = self.convert(result)
+
+        if result:
+            logger.debug('获取get_robot_data成功')
         else:
-            no_detail = kwargs.get('no_detail')
-            if no_detail != True:
-                return data
-            else:
+            logger.info('获取get_robot_data失败')
+
+        return result
+
+    def resolve(self, **kwargs):
+        '''
+        解析问句，返回get_robot_data的结果，配置了robot_cache时优先使用未过期的缓存
+
+        Returns:
+            dict: data（condition、comp_id、uuid等）、row_count、url、url_params
+        '''
+        params = self._load_robot_data(kwargs)
+        if params is None:
+            params = self.get_robot_data(**kwargs)
+            self._store_robot_data(kwargs, params)
+        return params
+
+    def get_page(self, url_params, **kwargs):
+        '''获取每页数据'''
+        page, data_list, columns = self._fetch_page(url_params, **kwargs)
+        result = self.data_processor.process_data(data_list, columns)
+
+        if result is None:
+            logger.error(f'第{page}页失败')
+
+        return result
+
+    def _fetch_page(self, url_params, **kwargs):
+        '''请求一页数据，返回(页码, 数据列表, 列定义)，不做转换'''
+        return self._request_page(self.post, url_params, **kwargs)
+
+    def _request_page(self, post, url_params, **kwargs):
+        '''使用post发送一页数据的请求并解析'''
+        user_agent = kwargs.get('user_agent', None)
+        request_params = kwargs.get('request_params', {})
+        target_url, data, path, colpath = self._page_request(url_params, **kwargs)
+
+        logger.debug(f'第{data.get("page")}页开始')
+
+        request_params['timeout'] = (5, 10)
+        res = post(target_url, data=data, headers=wencai_headers(user_agent), **request_params)
+        return self._parse_page(res.content, data, path, colpath)
+
+    def iter_loop_page(self, loop, row_count, url_params, pipeline=False, **kwargs):
+        '''
+        逐页产出转换后的数据，参数同loop_page
+
+        Args:
+            pipeline: 是否流水线执行，转换当前页时由后台线程获取下一页
+        '''
+        pages = self._page_numbers(loop, row_count, kwargs)
+        if not pipeline:
+            for page in pages:
+                yield self.get_page(url_params, **{**kwargs, 'page': page})
+            return
+        if not pages:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        pending = executor.submit(self._fetch_page, url_params, **{**kwargs, 'page': pages[0]})
+        try:
+            for index in range(len(pages)):
+                page, data_list, columns = pending.result()
+                pending = None
+                if index + 1 < len(pages):
+                    pending = executor.submit(self._fetch_page, url_params, **{**kwargs, 'page': pages[index + 1]})
+                result = self.data_processor.process_data(data_list, columns)
+                if result is None:
+                    logger.error(f'第{page}页失败')
+                yield result
+        finally:
+            if pending is not None:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+    def _fetch_page_retrying(self, url_params, page_retries, **kwargs):
+        '''请求一页数据，失败时按指数退避最多再尝试page_retries次，每页最多请求page_retries + 1次'''
+        # 不使用post自带的重试，重试次数完全由page_retries决定
+        post = partial(type(self).post.retry_with(stop=stop_after_attempt(1), reraise=True), self)
+        for attempt in Retrying(
+                wait=wait_exponential(multiplier=self.page_backoff, min=4 * self.page_backoff,
+                                      max=10 * self.page_backoff),
+                stop=stop_after_attempt(page_retries + 1),
+                before_sleep=lambda state: logger.debug(
+                    f'第{kwargs.get("page")}页失败，第{state.attempt_number}次重试: {state.outcome.exception()}'),
+                reraise=True):
+            with attempt:
+                return self._request_page(post, url_params, **kwargs)
+
+    def _parallel_pages(self, pages, url_params, workers, page_retries, errors, kwargs):
+        '''使用线程池并行获取各页，按页码顺序返回转换后的数据，失败的页记录到errors后跳过'''
+        executor = ThreadPoolExecutor(max_workers=min(workers, len(pages)))
+        futures = [executor.submit(self._fetch_page_retrying, url_params, page_retries, **{**kwargs, 'page': page})
+                   for page in pages]
+        results = []
+        try:
+            for page, future in zip(pages, futures):
+                try:
+                    _, data_list, columns = future.result()
+                except Exception as e:
+                    logger.warning(f'第{page}页获取失败，已跳过: {str(e)}')
+                    errors[page] = str(e)
+                    continue
+                result = self.data_processor.process_data(data_list, columns)
+                if result is None:
+                    logger.error(f'第{page}页失败')
+                results.append(result)
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        return results
+
+    def loop_page(self, loop, row_count, url_params, pipeline=False, workers=1, page_retries=PAGE_RETRIES,
+                  errors=None, **kwargs):
+        '''
+        循环分页，收集各页后一次合并
+
+        Args:
+            pipeline: 是否流水线执行，转换当前页时预先获取下一页
+            workers: 并行获取分页的线程数，大于1时同时请求全部页码，按页码顺序合并
+            page_retries: 并行模式下每页失败后的重试次数，每页最多请求page_retries + 1次（不叠加post自带的重试），
+                默认与逐页获取相同，每页最多请求5次
+            errors: 并行模式下收集失败页的字典（页码 -> 错误信息）。与逐页获取不同，并行模式下重试后仍失败的页
+                只记录警告日志并从结果中略去，不会中断整个查询，需要完整结果时应检查errors
+        '''
+        if workers > 1:
+            page_numbers = self._page_numbers(loop, row_count, kwargs)
+            if not page_numbers:
                 return None
+            pages = self._parallel_pages(page_numbers, url_params, workers, page_retries,
+                                         errors if errors is not None else {}, kwargs)
+        else:
+            pages = list(self.iter_loop_page(loop, row_count, url_params, pipeline=pipeline, **kwargs))
+        if not pages:
+            return None
+        if len(pages) == 1:
+            return pages[0]
+        return concat(pages, ignore_index=True)
+
+    def convert(self, res):
+        '''处理get_robot_data的结果'''
+        # 响应体可能很大，只在开启DEBUG日志时才解码输出
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(res.text)
+        return self._parse_robot_data(res.content)
+
+    def search(self, loop=False, limit=None, pipeline=False, workers=1, page_retries=PAGE_RETRIES, page_errors=None, **kwargs):
+        '''
+        查询i问财数据
+
+        Args:
+            loop: True表示获取全部分页，整数表示最多获取的页数，False只获取第一页
+            limit: 表格结果最多返回的行数，None表示不限制
+            pipeline: 多页查询时是否流水线执行，转换当前页时预先获取下一页
+            workers: 多页查询时并行获取分页的线程数，1表示逐页获取
+            page_retries: 并行获取时每页失败后的重试次数，默认与逐页获取相同，每页最多请求5次
+            page_errors: 传入字典时收集并行获取失败的页（页码 -> 错误信息）。逐页获取时失败会抛出异常，
+                并行获取时重试后仍失败的页只记录警告日志并从结果中略去，需要完整结果时应检查page_errors
+            **kwargs: query、perpage、query_type等请求参数
+        '''
+        # 并发的相同查询只执行一次，共享同一结果
+        key = json.dumps([loop, limit, sorted(kwargs.items())], ensure_ascii=False, default=str)
+        result, errors = self._single_flight.do(key, self._cached_search, loop, limit, pipeline,
+                                                workers, page_retries, **kwargs)
+        if page_errors is not None:
+            page_errors.update(errors)
+        return result
+
+    def iter_pages(self, loop=True, pipeline=False, **kwargs):
+        '''
+        逐页查询i问财表格数据，每获取一页即产出转换后的DataFrame
+
+        结果不是表格（没有选股条件）时不产出任何数据
+
+        Args:
+            loop: True表示获取全部分页，整数表示最多获取的页数，False只获取第一页
+            pipeline: 是否流水线执行，转换当前页时预先获取下一页
+            **kwargs: query、perpage、query_type等请求参数
+        '''
+        params = self.resolve(**kwargs)
+        data = params.get('data')
+        if data.get('condition', None) is None:
+            return
+
+        kwargs = {**kwargs, **data}
+        if loop and kwargs.get('find', None) is None:
+            yield from self.iter_loop_page(loop, params.get('row_count'), params.get('url_params'),
+                                           pipeline=pipeline, **kwargs)
+        else:
+            yield self.get_page(params.get('url_params'), **kwargs)
+
+    def _cached_search(self, loop=False, limit=None, pipeline=False, workers=1, page_retries=PAGE_RETRIES, **kwargs):
+        '''返回(查询结果, 失败页)，有失败页的不完整结果不写入缓存'''
+        errors = {}
+        cache = self.cache or get_default_cache()
+        if cache is None:
+            return self._search(loop, limit, pipeline, workers, page_retries, errors, **kwargs), errors
+
+        params = {k: v for k, v in kwargs.items() if k not in ('query', 'user_agent', 'request_params')}
+        cache_key = cache.make_key('wencai', kwargs.get('query'), loop=loop, limit=limit,
+                                   compact=self.data_processor.compact, downcast=self.data_processor.downcast,
+                                   **params)
+        result = cache.get(cache_key)
+        if result is None:
+            result = self._search(loop, limit, pipeline, workers, page_retries, errors, **kwargs)
+            if result is not None and not errors:
+                cache.set(cache_key, result)
+        else:
+            logger.debug(f'命中缓存: {kwargs.get("query")}')
+        return result, errors
+
+    def _search(self, loop=False, limit=None, pipeline=False, workers=1, page_retries=PAGE_RETRIES, errors=None, **kwargs):
+        params = self._load_robot_data(kwargs)
+        if params is not None:
+            try:
+                return self._query(params, loop, limit, pipeline, workers, page_retries, errors, **kwargs)
+            except Exception as e:
+                # 缓存的条件可能已失效（如行数变化），重新解析问句后再查询一次
+                logger.info(f'使用缓存的查询条件失败，重新解析问句: {str(e)}')
+                self._drop_robot_data(kwargs)
+                if errors:
+                    errors.clear()
+
+        params = self.get_robot_data(**kwargs)
+        self._store_robot_data(kwargs, params)
+        return self._query(params, loop, limit, pipeline, workers, page_retries, errors, **kwargs)
+
+    def _query(self, params, loop=False, limit=None, pipeline=False, workers=1, page_retries=PAGE_RETRIES, errors=None, **kwargs):
+        '''根据问句解析结果获取数据'''
+        request = self._query_request(params, loop, kwargs, pipeline=pipeline, workers=workers,
+                                      page_retries=page_retries, errors=errors)
+        if request is None:
+            return self._detail_result(params, kwargs)
+        fetch, args, fetch_kwargs = request
+        return self._limit_rows(fetch(*args, **fetch_kwargs), limit)
 
 
 @lru_cache(maxsize=1)
@@ -196,20 +480,205 @@ def create_client() -> WencaiStockClient:
     return WencaiStockClient()
 
 
+def _search_kwargs(max_count: Optional[int] = None, max_page: Optional[int] = None) -> Dict[str, Any]:
+    """根据max_count/max_page计算分页计划，返回search的loop、limit和perpage参数"""
+    plan = plan_pages(max_count, max_page, WENCAI_PAGE_SIZE)
+    if plan.page_count == 1:
+        loop = False
+    else:
+        loop = plan.page_count or True
+    return {'loop': loop, 'limit': plan.limit, 'perpage': plan.page_size}
+
+
 def search_wencai(keyword: str, max_count: Optional[int] = None,
                max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
     """使用i问财接口搜索股票数据"""
-    loop = True
-    if max_count is None and max_page is None:
-        loop = True
-    elif max_page is not None and max_page <= 1:
-        loop = False
-    elif max_count is not None and max_count <= 100:
-        loop = False
     try:
-        return create_client().search(loop=loop, query=keyword)
+        return create_client().search(query=keyword, **_search_kwargs(max_count, max_page))
+    except Exception as e:
+        logger.error('获取i问财数据失败: %s', e)
+        logger.debug(format_exc())
+        random_useragent.cache_clear()
+    return None
+
+
+def search_wencai_many(keywords: Iterable[str],
+                       concurrency: int = 4,
+                       max_count: Optional[int] = None,
+                       max_page: Optional[int] = None,
+                       timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """使用i问财接口批量查询多个关键词，参数和返回值同emxg.client.search_many"""
+    client = create_client()
+    search_kwargs = _search_kwargs(max_count, max_page)
+    return run_batch(lambda keyword: client.search(query=keyword, **search_kwargs),
+                     keywords, concurrency=concurrency, timeout=timeout)
+
+
+def _async_retryable(exc: BaseException) -> bool:
+    '''aiohttp的连接错误、HTTP错误和超时可以重试'''
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    try:
+        import aiohttp
+    except ImportError:
+        return False
+    return isinstance(exc, aiohttp.ClientError)
+
+
+class AsyncWencaiStockClient(WencaiRequestMixin, AsyncSessionClient):
+    ''' iWencai条件选股异步查询客户端（基于aiohttp）
+
+    请求头、get_robot_data解析和返回结果与WencaiStockClient一致，获取首页条件后并发请求各分页
+    '''
+    def __init__(self, session: Any = None, limit: int = 100, timeout: float = 30,
+                 concurrency: int = 8, retries: int = 5, backoff: float = 1,
+                 robot_cache: Optional[ResponseCache] = None):
+        '''
+        Args:
+            session: 外部传入的aiohttp.ClientSession，None表示首次请求时自动创建
+            limit: 自动创建连接池时的最大连接数
+            timeout: 单次请求超时时间（秒）
+            concurrency: 单次查询同时请求的最大分页数
+            retries: 每个请求的最大尝试次数
+            backoff: 重试等待时间的倍数，1表示与同步客户端相同的4~10秒指数退避
+            robot_cache: 问句解析结果的缓存，同WencaiStockClient
+        '''
+        self._init_session(session, limit, timeout)
+        self.robot_cache = robot_cache
+        self.data_processor = DataProcessor()
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+
+    async def _post(self, url, json=None, data=None, user_agent=None) -> bytes:
+        '''发送请求并返回响应体，网络错误时按指数退避重试'''
+        async for attempt in AsyncRetrying(
+                wait=wait_exponential(multiplier=self.backoff, min=4 * self.backoff, max=10 * self.backoff),
+                stop=stop_after_attempt(self.retries),
+                retry=retry_if_exception(_async_retryable),
+                reraise=True):
+            with attempt:
+                await athrottle('wencai')
+                # 每次尝试重新生成hexin-v令牌
+                headers = wencai_headers(user_agent)
+                async with self._get_session().post(url, json=json, data=data, headers=headers) as response:
+                    response.raise_for_status()
+                    return await response.read()
+
+    async def get_robot_data(self, **kwargs):
+        url, data = self._robot_request(**kwargs)
+
+        logger.debug('获取condition开始')
+
+        body = await self._post(url, json=data, user_agent=kwargs.get('user_agent', None))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(body.decode('utf-8', errors='replace'))
+        result = self._parse_robot_data(body)
+
+        if result:
+            logger.debug('获取get_robot_data成功')
+        else:
+            logger.info('获取get_robot_data失败')
+
+        return result
+
+    async def _fetch_page(self, url_params, **kwargs):
+        '''请求一页数据，返回(页码, 数据列表, 列定义)，不做转换'''
+        target_url, data, path, colpath = self._page_request(url_params, **kwargs)
+
+        logger.debug(f'第{data.get("page")}页开始')
+
+        body = await self._post(target_url, data=data, user_agent=kwargs.get('user_agent', None))
+        return self._parse_page(body, data, path, colpath)
+
+    async def get_page(self, url_params, **kwargs):
+        '''获取每页数据'''
+        page, data_list, columns = await self._fetch_page(url_params, **kwargs)
+        result = self.data_processor.process_data(data_list, columns)
+
+        if result is None:
+            logger.error(f'第{page}页失败')
+
+        return result
+
+    async def loop_page(self, loop, row_count, url_params, **kwargs):
+        '''并发获取各分页，按页码顺序合并，任一页失败时取消其余请求并抛出异常'''
+        pages = self._page_numbers(loop, row_count, kwargs)
+        if not pages:
+            return None
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+
+        async def fetch(page):
+            async with semaphore:
+                return await self._fetch_page(url_params, **{**kwargs, 'page': page})
+
+        tasks = [asyncio.ensure_future(fetch(page)) for page in pages]
+        try:
+            raw_pages = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        results = []
+        for page, data_list, columns in raw_pages:
+            result = self.data_processor.process_data(data_list, columns)
+            if result is None:
+                logger.error(f'第{page}页失败')
+            results.append(result)
+        if len(results) == 1:
+            return results[0]
+        return concat(results, ignore_index=True)
+
+    async def resolve(self, **kwargs):
+        '''解析问句，配置了robot_cache时优先使用未过期的缓存'''
+        params = self._load_robot_data(kwargs)
+        if params is None:
+            params = await self.get_robot_data(**kwargs)
+            self._store_robot_data(kwargs, params)
+        return params
+
+    async def search(self, loop=False, limit=None, **kwargs):
+        '''
+        异步查询i问财数据，参数和返回值与WencaiStockClient.search一致
+        '''
+        params = self._load_robot_data(kwargs)
+        if params is not None:
+            try:
+                return await self._query(params, loop, limit, **kwargs)
+            except Exception as e:
+                logger.info(f'使用缓存的查询条件失败，重新解析问句: {str(e)}')
+                self._drop_robot_data(kwargs)
+
+        params = await self.get_robot_data(**kwargs)
+        self._store_robot_data(kwargs, params)
+        return await self._query(params, loop, limit, **kwargs)
+
+    async def _query(self, params, loop=False, limit=None, **kwargs):
+        '''根据问句解析结果获取数据'''
+        request = self._query_request(params, loop, kwargs)
+        if request is None:
+            return self._detail_result(params, kwargs)
+        fetch, args, fetch_kwargs = request
+        return self._limit_rows(await fetch(*args, **fetch_kwargs), limit)
+
+
+# 每个事件循环缓存一个异步客户端实例
+_async_clients: 'WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncWencaiStockClient]' = WeakKeyDictionary()
+
+
+def create_async_client() -> AsyncWencaiStockClient:
+    """创建并缓存当前事件循环的AsyncWencaiStockClient实例"""
+    return loop_local(_async_clients, AsyncWencaiStockClient)
+
+
+async def asearch_wencai(keyword: str, max_count: Optional[int] = None,
+                         max_page: Optional[int] = None) -> Union[DataFrame, List[Dict[str, Any]]]:
+    """search_wencai的异步版本，使用当前事件循环缓存的异步客户端实例"""
+    try:
+        return await create_async_client().search(query=keyword, **_search_kwargs(max_count, max_page))
     except Exception as e:
-        logger.error('获取i问财数据失败', e)
+        logger.error('获取i问财数据失败: %s', e)
         logger.debug(format_exc())
         random_useragent.cache_clear()
     return None
@@ -1,8 +1,8 @@
-import json
 from urllib.parse import urlparse, parse_qs
 from pydash import _
-from .data_adapter import DataFrame
+from .data_adapter import create_frame
 from .device_info import wencai_headers, wencai_session
+from .fastjson import loads
 
 
 def get_url(url):
@@ -11,7 +11,7 @@ def get_url(url):
         url=f'http://www.iwencai.com{url}',
         headers=wencai_headers()
     )
-    result = json.loads(res.text)
+    result = loads(res.content)
     return result.get('data')
 
 def xuangu_tableV1_handler(comp, comps):
@@ -26,7 +26,7 @@ def common_handler(comp, comps):
     '''common类型'''
     datas = _.get(comp, 'data.datas')
     if isinstance(datas, list):
-        return DataFrame.from_dict(datas)
+        return create_frame(datas)
     else:
         return _.get(comp, 'data')
 
@@ -80,11 +80,11 @@ def dragon_tiger_stock_handler(comp, comps):
     data = _.get(comp, 'data.datas.0')
     detail = data.pop('detail', None)
 
-    result['data'] = DataFrame.from_dict([data])
+    result['data'] = create_frame([data])
     if detail is not None:
         result['detail'] = {
-            'buy': DataFrame.from_dict(_.get(detail[0], 'buy.datas')),
-            'sell': DataFrame.from_dict(_.get(detail[0], 'sell.datas'))
+            'buy': create_frame(_.get(detail[0], 'buy.datas')),
+            'sell': create_frame(_.get(detail[0], 'sell.datas'))
         }
     return result
 
@@ -100,7 +100,7 @@ def dragon_tiger_stock_handler(comp, comps):
 
 def textblocklinkone_handler(comp, comps):
     data = _.get(comp, 'data.result.data')
-    return DataFrame.from_dict(data)
+    return create_frame(data)
 
 def nestedblocks_handler(comp, comps):
     '''股东户数分析'''
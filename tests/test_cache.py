@@ -0,0 +1,102 @@
+"""
+测试ResponseCache查询结果缓存
+"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from unittest.mock import patch
+
+from emxg import EMStockClient, ResponseCache
+from emxg.cache import CN_TZ, trading_session
+from emxg.data_adapter import create_frame, to_records
+
+
+class TestResponseCache:
+    """测试ResponseCache类"""
+
+    def test_set_get_roundtrip(self, tmp_path):
+        """测试写入后读取"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+        key = cache.make_key("emxg", "今日涨停", page_size=50, max_count=None)
+
+        cache.set(key, create_frame([{"代码": "000001"}]))
+
+        assert to_records(cache.get(key)) == [{"代码": "000001"}]
+        assert cache.get(cache.make_key("emxg", "今日涨停", page_size=30, max_count=None)) is None
+
+    def test_ttl_expire(self, tmp_path):
+        """测试过期条目不再返回"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=0.05)
+        cache.set("key", [1, 2, 3])
+        time.sleep(0.1)
+
+        assert cache.get("key") is None
+
+    def test_key_includes_backend(self, tmp_path):
+        """测试缓存键包含数据处理后端"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+        key = cache.make_key("emxg", "今日涨停", page_size=50)
+
+        with patch("emxg.cache.BACKEND", "other"):
+            assert cache.make_key("emxg", "今日涨停", page_size=50) != key
+
+    def test_unreadable_value_is_miss(self, tmp_path):
+        """测试无法反序列化的缓存（如依赖未安装的库）视为未命中"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+        cache.set("key", [1, 2, 3])
+
+        with patch("emxg.cache.pickle.loads", side_effect=ModuleNotFoundError("No module named 'polars'")):
+            assert cache.get("key") is None
+
+    def test_delete(self, tmp_path):
+        """测试删除单个条目"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.delete("a")
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+    def test_lru_eviction(self, tmp_path):
+        """测试超过容量时淘汰最久未访问的条目"""
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60, max_bytes=2500)
+        cache.set("a", b"x" * 1000)
+        cache.set("b", b"x" * 1000)
+        cache.get("a")
+        cache.set("c", b"x" * 1000)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    @pytest.mark.parametrize("hour, minute, phase", [
+        (9, 0, "pre"), (10, 0, "am"), (12, 0, "noon"), (14, 59, "pm"), (15, 0, "post"),
+    ])
+    def test_trading_session(self, hour, minute, phase):
+        """测试交易时段划分"""
+        now = datetime(2026, 10, 16, hour, minute, tzinfo=CN_TZ)
+        assert trading_session(now) == f"2026-10-16:{phase}"
+
+
+class TestClientCache:
+    """测试客户端使用缓存"""
+
+    def test_em_search_served_from_cache(self, tmp_path):
+        """测试重复查询直接读取缓存"""
+        client = EMStockClient(cache=ResponseCache(str(tmp_path / "cache.sqlite")))
+        df = create_frame([{"代码": "000001"}])
+
+        with patch.object(client, "_iter_raw_pages", return_value=iter([([], [{"SECURITY_CODE": "000001"}])])) as pages:
+            with patch.object(client.data_processor, "process_data", return_value=df):
+                first = client.search("今日涨停")
+                second = client.search("今日涨停")
+                # 压缩存储的设置不同时不共用缓存
+                client.data_processor.compact = True
+                client.search("今日涨停")
+
+        assert pages.call_count == 2
+        assert to_records(first) == to_records(second)
@@ -2,11 +2,95 @@
 测试EMStockClient类
 """
 
+import asyncio
+import json
+import socket
+import threading
+import time
+
 import pytest
 
 from unittest.mock import Mock, patch
 
-from emxg import EMStockClient, search_emxg, DataFrame
+from emxg import EMStockClient, search_emxg, DataFrame, AsyncEMStockClient, search_many, TransportConfig
+from emxg.data_adapter import column_names, create_frame, to_records
+
+
+COLUMNS = [
+    {"key": "SECURITY_CODE", "title": "代码", "dataType": "String"},
+    {"key": "CHG", "title": "涨跌幅", "dataType": "Double", "unit": "%"},
+]
+
+
+def em_page(codes, total, xc_id="xc-1"):
+    """构造一页东方财富接口返回数据"""
+    return {
+        "code": "100",
+        "data": {"result": {
+            "columns": COLUMNS,
+            "dataList": [{"SECURITY_CODE": code, "CHG": "10.5"} for code in codes],
+            "total": total,
+            "xcId": xc_id,
+        }}
+    }
+
+
+def column(df, name):
+    """返回一列的Python值列表，与数据处理后端无关"""
+    return [row[name] for row in to_records(df)]
+
+
+def encode(payload):
+    """序列化为响应体字节"""
+    return json.dumps(payload).encode()
+
+
+class FakeSession:
+    """按pageNo返回预设页面的requests会话，pages中的异常实例会被抛出"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def post(self, url, json=None, **kwargs):
+        self.requests.append(json)
+        page = self.pages[json["pageNo"] - 1]
+        if isinstance(page, Exception):
+            raise page
+        response = Mock()
+        response.content = encode(page)
+        return response
+
+
+class FakeAsyncResponse:
+    """模拟aiohttp响应"""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self):
+        return encode(self.payload)
+
+
+class FakeAsyncSession:
+    """按pageNo返回预设页面的aiohttp会话"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def post(self, url, json=None, **kwargs):
+        self.requests.append(json)
+        return FakeAsyncResponse(self.pages[json["pageNo"] - 1])
 
 
 class TestEMStockClient:
@@ -69,6 +153,123 @@ class TestEMStockClient:
         assert dps._convert_percentage("无效") == "无效"
 
 
+class TestConcurrentSearch:
+    """测试并发分页获取"""
+
+    def test_concurrent_pages_in_order(self):
+        """测试并发获取的页面按页码顺序拼接，并复用首页xcId"""
+        client = EMStockClient()
+        client.session = FakeSession([
+            em_page(["000001", "000002"], total=7, xc_id="xc-1"),
+            em_page(["000003", "000004"], total=7),
+            em_page(["000005", "000006"], total=7),
+            em_page(["000007"], total=7),
+        ])
+
+        result = client.search("测试关键词", page_size=2, concurrency=3)
+
+        assert column(result, "代码") == ["000001", "000002", "000003", "000004", "000005", "000006", "000007"]
+        later = [r for r in client.session.requests if r["pageNo"] > 1]
+        assert sorted(r["pageNo"] for r in later) == [2, 3, 4]
+        assert all(r["xcId"] == "xc-1" for r in later)
+
+    def test_concurrent_respects_limits_and_failures(self):
+        """测试并发模式下的max_count截断和失败页截断"""
+        client = EMStockClient()
+        client.session = FakeSession([
+            em_page(["000001", "000002"], total=8),
+            em_page(["000003", "000004"], total=8),
+            RuntimeError("网络错误"),
+            em_page(["000007", "000008"], total=8),
+        ])
+
+        assert len(client.search("测试关键词", page_size=2, max_count=3, concurrency=4)) == 3
+        assert len(client.search("测试关键词", page_size=2, concurrency=4)) == 4
+
+
+class TestIterPages:
+    """测试逐页产出接口"""
+
+    def _client(self):
+        client = EMStockClient()
+        client.session = FakeSession([
+            em_page(["000001", "000002"], total=5),
+            em_page(["000003", "000004"], total=5),
+            em_page(["000005"], total=5),
+        ])
+        return client
+
+    @pytest.mark.parametrize("prefetch", [False, True])
+    def test_iter_pages(self, prefetch):
+        """测试每页产出已转换的数据"""
+        pages = list(self._client().iter_pages("测试关键词", page_size=2, prefetch=prefetch))
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert column(pages[2], "代码") == ["000005"]
+        assert column(pages[2], "涨跌幅") == [0.105]
+
+    def test_pipeline_search(self):
+        """测试流水线模式合并逐页转换的结果，与整体转换一致"""
+        expected = self._client().search("测试关键词", page_size=2)
+        result = self._client().search("测试关键词", page_size=2, pipeline=True)
+
+        assert to_records(result) == to_records(expected)
+
+    def test_iter_rows_max_count(self):
+        """测试逐行产出并截断到max_count"""
+        rows = list(self._client().iter_rows("测试关键词", page_size=2, max_count=3))
+
+        assert [row["代码"] for row in rows] == ["000001", "000002", "000003"]
+
+
+class TestSingleFlight:
+    """测试并发相同查询合并"""
+
+    def test_concurrent_identical_searches_share_one_fetch(self):
+        """测试并发的相同查询只请求一次"""
+        client = EMStockClient()
+        calls = []
+
+        def slow_pages(*args, **kwargs):
+            calls.append(args)
+            time.sleep(0.2)
+            return iter([(COLUMNS, [{"SECURITY_CODE": "000001", "CHG": "1"}])])
+
+        results = []
+        with patch.object(client, "_iter_raw_pages", side_effect=slow_pages):
+            threads = [threading.Thread(target=lambda: results.append(client.search("今日涨停")))
+                       for _ in range(5)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            client.search("涨停板首板")
+
+        assert len(calls) == 2
+        assert len(results) == 5
+        assert all(r is results[0] for r in results)
+
+
+class TestTransportConfig:
+    """测试传输层配置"""
+
+    def test_client_session_pool(self):
+        """测试客户端会话使用配置的连接池参数"""
+        config = TransportConfig(pool_connections=4, pool_maxsize=32, pool_block=True)
+        client = EMStockClient(transport=config)
+
+        adapter = client.session.get_adapter(client.base_url)
+        assert adapter._pool_connections == 4
+        assert adapter._pool_maxsize == 32
+        assert adapter._pool_block is True
+        assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw["socket_options"]
+
+    def test_disable_keep_alive(self):
+        """测试关闭长连接"""
+        session = TransportConfig(keep_alive=False).create_session()
+        assert session.headers["Connection"] == "close"
+
+
 class TestSearchEMXG:
     """测试search_emxg便捷函数"""
     
@@ -82,7 +283,7 @@ class TestSearchEMXG:
         #     '名称': ['平安银行', '万科A'],
         #     '最新价': [10.0, 20.0]
         # })
-        mock_df = DataFrame([
+        mock_df = create_frame([
             {'代码': '000001', '名称': '平安银行', '最新价': 10.0},
             {'代码': '000002', '名称': '万科A', '最新价': 20.0}
         ])
@@ -95,7 +296,7 @@ class TestSearchEMXG:
         # 验证结果
         assert isinstance(result, DataFrame)
         assert len(result) == 2
-        assert '代码' in result.columns
+        assert '代码' in column_names(result)
         
         # 验证调用参数
         mock_client.search.assert_called_once_with(
@@ -106,6 +307,104 @@ class TestSearchEMXG:
         )
 
 
+class TestAsyncEMStockClient:
+    """测试AsyncEMStockClient类"""
+
+    def test_search_paginates_with_xc_id(self):
+        """测试异步分页查询及xcId传递"""
+        session = FakeAsyncSession([
+            em_page(["000001", "000002"], total=3, xc_id="xc-1"),
+            em_page(["000003"], total=3, xc_id="xc-2"),
+        ])
+        client = AsyncEMStockClient(session=session)
+
+        result = asyncio.run(client.search("测试关键词", page_size=2))
+
+        assert len(result) == 3
+        assert column(result, "代码") == ["000001", "000002", "000003"]
+        assert column(result, "涨跌幅") == [0.105, 0.105, 0.105]
+        assert [r["pageNo"] for r in session.requests] == [1, 2]
+        assert session.requests[0]["xcId"] == ""
+        assert session.requests[1]["xcId"] == "xc-1"
+        assert session.requests[1]["fingerprint"] == client.fingerprint
+
+    def test_search_first_page_error(self):
+        """测试首页返回错误时抛出异常"""
+        session = FakeAsyncSession([{"code": "500", "msg": "错误"}])
+        client = AsyncEMStockClient(session=session)
+
+        with pytest.raises(Exception, match="查询失败"):
+            asyncio.run(client.search("测试关键词"))
+
+    def test_no_sync_only_methods(self):
+        """测试异步客户端不暴露依赖同步会话的方法"""
+        client = AsyncEMStockClient(session=FakeAsyncSession([]))
+
+        for name in ("search_delta", "watch", "iter_pages", "iter_rows"):
+            assert not hasattr(client, name)
+
+    def test_asearch_emxg_logs_error(self, caplog):
+        """测试异步便捷函数失败时记录异常信息并返回None"""
+        from emxg.client import asearch_emxg
+
+        async def run():
+            with patch.object(AsyncEMStockClient, "search", side_effect=RuntimeError("网络错误")):
+                return await asearch_emxg("测试关键词")
+
+        with caplog.at_level("ERROR", logger="emxg"):
+            assert asyncio.run(run()) is None
+        assert "获取东方财富数据失败: 网络错误" in caplog.text
+
+
+class TestSearchMany:
+    """测试search_many批量查询"""
+
+    @patch('emxg.client.create_client')
+    def test_errors_and_timeouts_do_not_stall_batch(self, mock_create_client):
+        """测试单个关键词失败或超时不影响其他关键词"""
+        def search(keyword, **kwargs):
+            if keyword == "失败":
+                raise RuntimeError("接口错误")
+            if keyword == "超时":
+                time.sleep(1)
+            return create_frame([{"代码": "000001"}, {"代码": "000002"}])
+
+        mock_create_client.return_value.search.side_effect = search
+
+        results, report = search_many(["今日涨停", "失败", "超时", "今日涨停"],
+                                      concurrency=3, max_count=10, timeout=0.3)
+
+        assert list(results) == ["今日涨停", "失败", "超时"]
+        assert len(results["今日涨停"]) == 2
+        assert results["失败"] is None and results["超时"] is None
+        assert report["今日涨停"]["status"] == "ok" and report["今日涨停"]["rows"] == 2
+        assert report["失败"]["status"] == "error" and "接口错误" in report["失败"]["error"]
+        assert report["超时"]["status"] == "timeout"
+        mock_create_client.return_value.search.assert_any_call("今日涨停", page_size=50, max_count=10, max_page=None)
+
+    @patch('emxg.client.create_client')
+    def test_hung_workers_do_not_stall_queue(self, mock_create_client):
+        """测试所有线程都被超时的查询占用时，排队的关键词记为超时而不是一直等待"""
+        release = threading.Event()
+
+        def search(keyword, **kwargs):
+            if keyword.startswith("挂起"):
+                release.wait(5)
+            return create_frame([{"代码": "000001"}])
+
+        mock_create_client.return_value.search.side_effect = search
+
+        started = time.monotonic()
+        try:
+            results, report = search_many(["挂起1", "挂起2", "排队1", "排队2"], concurrency=2, timeout=0.2)
+        finally:
+            release.set()
+
+        assert time.monotonic() - started < 2
+        assert [report[k]["status"] for k in ("挂起1", "挂起2", "排队1", "排队2")] == ["timeout"] * 4
+        assert "no free worker" in report["排队1"]["error"]
+
+
 @pytest.mark.skip(reason="集成测试，需要实际网络请求")
 class TestDataProcessing:
     """测试数据处理功能"""
@@ -0,0 +1,280 @@
+"""
+测试数据处理适配器
+"""
+
+import math
+
+import pytest
+
+from emxg.data_adapter import BACKEND, DataProcessor, DataFrame, _select_backend, compile_schema, concat, to_records
+
+
+COLUMNS = [
+    {"key": "SECURITY_CODE", "title": "代码", "dataType": "String"},
+    {"key": "AMOUNT", "title": "成交额", "dataType": "Double", "unit": "元"},
+    {"key": "CHG", "title": "涨跌幅", "dataType": "Double", "unit": "%"},
+    {"key": "FIRST", "title": "首板", "dataType": "Boolean"},
+]
+
+ROWS = [
+    {"SECURITY_CODE": "000001", "AMOUNT": "3.42亿", "CHG": "20.05", "FIRST": "首板"},
+    {"SECURITY_CODE": "000002", "AMOUNT": "7668.05万", "CHG": "12.345", "FIRST": "否"},
+    {"SECURITY_CODE": "000003", "AMOUNT": "-", "CHG": "-", "FIRST": "1"},
+    {"SECURITY_CODE": "000004", "AMOUNT": 1200.5, "CHG": None, "FIRST": None},
+]
+
+
+def same(a, b):
+    """比较转换结果，NaN与None视为相同的缺失值"""
+    missing = lambda v: v is None or (isinstance(v, float) and math.isnan(v))
+    return (missing(a) and missing(b)) or a == b
+
+
+def converted(value):
+    """标量转换的结果；pyarrow/polars后端的数值列中无法解析的原值为空值"""
+    return None if BACKEND in ("arrow", "polars") and isinstance(value, str) else value
+
+
+class TestConvertDataTypes:
+    """测试数据类型转换"""
+
+    def test_matches_scalar_converters(self):
+        """测试整列转换结果与逐个元素的标量转换一致"""
+        dp = DataProcessor()
+        df = dp.process_data([dict(row) for row in ROWS], COLUMNS)
+        records = to_records(df)
+
+        for raw, record in zip(ROWS, records):
+            assert record["代码"] == raw["SECURITY_CODE"]
+            assert same(record["成交额"], converted(dp._convert_chinese_number(raw["AMOUNT"])))
+            expected = dp._convert_percentage(dp._convert_chinese_number(raw["CHG"]))
+            assert same(record["涨跌幅"], converted(expected))
+            assert record["首板"] == dp._convert_bool(raw["FIRST"])
+
+    def test_values(self):
+        """测试单位、百分比和布尔转换"""
+        df = DataProcessor().process_data([dict(row) for row in ROWS], COLUMNS)
+        records = to_records(df)
+
+        assert records[0]["成交额"] == 342000000
+        assert records[1]["成交额"] == 76680500
+        assert records[2]["成交额"] == converted("-")
+        assert records[0]["涨跌幅"] == 0.2005
+        assert records[1]["涨跌幅"] == round(0.12345, 4)
+        assert [r["首板"] for r in records] == [True, False, True, False]
+
+    def test_raw_rows_not_modified(self):
+        """测试转换不修改原始数据"""
+        rows = [dict(row) for row in ROWS]
+        DataProcessor().process_data(rows, COLUMNS)
+
+        assert rows == ROWS
+
+    def test_clean_numeric_column_is_float(self):
+        """测试规范数值列转换为float64"""
+        if BACKEND != "pandas":
+            pytest.skip("仅适用于pandas后端")
+        rows = [{"CHG": "1.5", "AMOUNT": "2万"}, {"CHG": "-0.25", "AMOUNT": "1亿"}]
+        df = DataProcessor().process_data(rows, COLUMNS[1:3])
+
+        assert str(df["涨跌幅"].dtype) == "float64"
+        assert str(df["成交额"].dtype) == "float64"
+        assert list(df["涨跌幅"]) == [0.015, -0.0025]
+
+    def test_unit_columns_match_scalar_converters(self):
+        """测试含单位和%的列整列转换为float64，无法解析的元素保留标量转换的结果"""
+        if BACKEND != "pandas":
+            pytest.skip("仅适用于pandas后端")
+        dp = DataProcessor()
+        amounts = ["3.42亿", " 7668.05万 ", "1e3", "1亿亿", "亿1", "1万亿", "-", None]
+        changes = ["12.345%", " -0.5 % ", "3万", "5亿%", "%", "nan", "0.1", None]
+        rows = [{"AMOUNT": a, "CHG": c} for a, c in zip(amounts, changes)]
+        df = dp.process_data(rows, COLUMNS[1:3])
+
+        assert all(map(same, df["成交额"], map(dp._convert_chinese_number, amounts)))
+        assert all(map(same, df["涨跌幅"], map(dp._convert_percent_number, changes)))
+
+        rows = [{"AMOUNT": a, "CHG": c} for a, c in zip(["1.5亿", "2万", None], ["12.345%", "-1%", None])]
+        df = dp.process_data(rows, COLUMNS[1:3])
+
+        assert str(df["成交额"].dtype) == "float64"
+        assert str(df["涨跌幅"].dtype) == "float64"
+        assert list(df["涨跌幅"][:2]) == [round(0.12345, 4), -0.01]
+
+
+class TestCompileSchema:
+    """测试列定义编译缓存"""
+
+    def test_plan(self):
+        """测试列名映射和类型转换计划"""
+        plan = compile_schema(COLUMNS, ROWS[0].keys())
+
+        assert plan.rename == {"SECURITY_CODE": "代码", "AMOUNT": "成交额", "CHG": "涨跌幅", "FIRST": "首板"}
+        assert plan.conversions == (("成交额", "number"), ("涨跌幅", "percent"), ("首板", "bool"))
+
+    def test_reused_for_equal_definitions(self):
+        """测试内容相同的列定义复用同一计划"""
+        columns = [dict(col) for col in COLUMNS]
+        assert compile_schema(columns, ROWS[0].keys()) is compile_schema(COLUMNS, ROWS[0].keys())
+        assert compile_schema(COLUMNS, ["CHG"]) is not compile_schema(COLUMNS, ROWS[0].keys())
+
+    def test_duplicate_keys_and_titles(self):
+        """测试重复key只保留第一个，重复标题追加后缀"""
+        columns = [
+            {"key": "CHG", "title": "涨跌幅", "dataType": "Double", "unit": "%"},
+            {"key": "CHG", "title": "涨幅", "dataType": "Double", "unit": "%"},
+            {"key": "CLOSE{20261016}", "title": "收盘价", "dataType": "Double"},
+            {"key": "CLOSE{20261015}", "title": "收盘价", "dataType": "Double"},
+            {"key": "NAME", "title": "名称", "dataType": "String"},
+            {"key": "NAME2", "title": "名称", "dataType": "String"},
+        ]
+        rows = [{"CHG": "10", "CLOSE{20261016}": "1.5", "CLOSE{20261015}": "1.4", "NAME": "a", "NAME2": "b"}]
+        records = to_records(DataProcessor().process_data(rows, columns))
+
+        assert records == [{"涨跌幅": 0.1, "收盘价": 1.5, "收盘价(20261015)": 1.4, "名称": "a", "名称_2": "b"}]
+
+    def test_unhashable_definition(self):
+        """测试列定义含不可哈希的值时仍可编译"""
+        columns = [{"key": "CHG", "title": "涨跌幅", "dataType": "Double", "unit": ["%"]}]
+        plan = compile_schema(columns, ["CHG"])
+
+        assert plan.conversions == (("涨跌幅", "number"),)
+
+
+class TestCompact:
+    """测试压缩列存储"""
+
+    COLUMNS = [
+        {"key": "CODE", "title": "代码", "dataType": "String"},
+        {"key": "INDUSTRY", "title": "行业", "dataType": "String"},
+        {"key": "PRICE", "title": "最新价", "dataType": "Double"},
+    ]
+    ROWS = [{"CODE": f"{i:06d}", "INDUSTRY": f"行业{i % 3}", "PRICE": f"{i}.5"} for i in range(60)]
+
+    def test_values_preserved(self):
+        """测试压缩后数据不变，低基数列占用减少"""
+        dp = DataProcessor()
+        df = dp.process_data([dict(row) for row in self.ROWS], self.COLUMNS)
+        compacted, report = dp.compact_dataframe(df)
+
+        assert to_records(compacted) == to_records(df)
+        assert set(report) == {"代码", "行业", "最新价"}
+        if BACKEND != "python":
+            assert report["行业"][1] < report["行业"][0]
+
+    def test_downcast(self):
+        """测试浮点数列降为32位"""
+        df = DataProcessor(compact=True, downcast=True).process_data([dict(row) for row in self.ROWS], self.COLUMNS)
+        prices = [row["最新价"] for row in to_records(df)]
+
+        assert prices == [i + 0.5 for i in range(60)]
+
+    def test_concat_pages(self):
+        """测试分别压缩的分页合并后数据不变"""
+        dp = DataProcessor(compact=True)
+        pages = [dp.process_data([dict(row) for row in self.ROWS[i:i + 20]], self.COLUMNS) for i in (0, 20, 40)]
+        df = concat(pages)
+
+        assert [row["代码"] for row in to_records(df)] == [row["CODE"] for row in self.ROWS]
+        assert [row["行业"] for row in to_records(df)] == [row["INDUSTRY"] for row in self.ROWS]
+        if BACKEND == "pandas":
+            assert str(df["行业"].dtype) == "category"
+
+
+class TestSelectBackend:
+    """测试数据处理后端选择"""
+
+    def test_default(self, monkeypatch):
+        """测试未指定时按是否安装pandas自动选择"""
+        monkeypatch.delenv("EMXG_BACKEND", raising=False)
+        assert _select_backend() in ("pandas", "python")
+
+    def test_configured(self, monkeypatch):
+        """测试通过环境变量指定后端"""
+        monkeypatch.setenv("EMXG_BACKEND", " Python ")
+        assert _select_backend() == "python"
+
+        monkeypatch.setenv("EMXG_BACKEND", "numpy")
+        with pytest.raises(ValueError):
+            _select_backend()
+
+
+@pytest.mark.parametrize("module_name", ["emxg.arrow_adapter", "emxg.polars_adapter"])
+class TestArrowBackends:
+    """测试pyarrow和polars后端直接由分页数据构建并转换"""
+
+    def _process(self, module_name, rows):
+        adapter = pytest.importorskip(module_name)
+        df = adapter.create_frame([dict(row) for row in rows])
+        plan = compile_schema(COLUMNS, adapter.column_names(df))
+        df = adapter.convert_columns(adapter.rename_columns(df, plan.rename), plan.conversions)
+        return adapter, df
+
+    def test_values(self, module_name):
+        """测试单位、百分比和布尔转换，无法解析的数值为空值"""
+        adapter, df = self._process(module_name, ROWS)
+        records = adapter.to_records(df)
+
+        assert [r["代码"] for r in records] == ["000001", "000002", "000003", "000004"]
+        assert [r["成交额"] for r in records] == [342000000, 76680500, None, 1200.5]
+        assert [r["涨跌幅"] for r in records] == [0.2005, 0.1235, None, None]
+        assert [r["首板"] for r in records] == [True, False, True, False]
+
+    def test_concat_and_head(self, module_name):
+        """测试合并已转换的分页并截取"""
+        adapter, first = self._process(module_name, ROWS[:2])
+        _, second = self._process(module_name, ROWS[2:])
+        df = adapter.concat([first, second])
+
+        assert len(df) == 4
+        assert [r["代码"] for r in adapter.to_records(adapter.head(df, 3))] == ["000001", "000002", "000003"]
+
+    def test_compact(self, module_name):
+        """测试低基数字符串列压缩和浮点数降位"""
+        adapter = pytest.importorskip(module_name)
+        rows = [{"industry": f"行业{i % 2}", "price": i + 0.5} for i in range(10)]
+        df, report = adapter.compact_frame(adapter.create_frame(rows), downcast=True)
+
+        assert adapter.to_records(df) == rows
+        assert all(after < before for before, after in report.values())
+
+
+@pytest.mark.skipif(BACKEND != "python", reason="仅适用于纯Python后端")
+class TestFallbackDataFrame:
+    """测试纯Python DataFrame"""
+
+    def _df(self):
+        return DataFrame([
+            {"代码": "000002", "名称": "万科A", "最新价": 20.0},
+            {"代码": "000001", "名称": "平安银行", "最新价": 10.0},
+            {"代码": "000003", "名称": "万科A", "最新价": 15.5},
+        ])
+
+    def test_columnar_storage(self):
+        """测试数值列使用array存储，重复字符串共享对象"""
+        df = self._df()
+        names = df["名称"]
+
+        assert type(df._data["最新价"]).__name__ == "array"
+        assert names[0] is names[2]
+        assert df.columns == ["代码", "名称", "最新价"]
+        assert df.shape == (3, 3)
+
+    def test_api(self, tmp_path):
+        """测试常用接口与原行存储实现一致"""
+        df = self._df()
+
+        assert df["最新价"] == [20.0, 10.0, 15.5]
+        assert df.head(2).to_dict("records")[1] == {"代码": "000001", "名称": "平安银行", "最新价": 10.0}
+        assert df.sort_values("最新价")["代码"] == ["000001", "000003", "000002"]
+        assert df.sort_values("最新价", ascending=False)["代码"] == ["000002", "000003", "000001"]
+        assert df[["代码"]].columns == ["代码"]
+        assert df.rename({"代码": "code"}).columns == ["code", "名称", "最新价"]
+        assert df.to_dict("dict")["代码"] == ["000002", "000001", "000003"]
+        assert [i for i, _ in df] == [0, 1, 2]
+        assert df.assign(x=lambda row: row["最新价"] * 2)["x"] == [40.0, 20.0, 31.0]
+        assert len(concat([df, df.head(1)])) == 4
+
+        path = tmp_path / "out.csv"
+        df.to_csv(str(path))
+        assert path.read_text(encoding="utf-8").splitlines()[1] == "000002,万科A,20.0"
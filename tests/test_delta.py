@@ -0,0 +1,74 @@
+"""
+测试增量对比
+"""
+
+from unittest.mock import patch
+
+from emxg import EMStockClient, DeltaTracker
+from emxg.data_adapter import create_frame
+
+
+def frame(rows):
+    return create_frame([{"代码": code, "最新价": price} for code, price in rows])
+
+
+class TestDeltaTracker:
+    """测试DeltaTracker类"""
+
+    def test_first_update_inserts_all(self):
+        """测试首次更新所有行视为新增"""
+        delta = DeltaTracker().update(frame([("000001", 10.0), ("000002", 20.0)]))
+
+        assert [r["代码"] for r in delta.inserted] == ["000001", "000002"]
+        assert not delta.deleted and not delta.changed
+
+    def test_insert_delete_change(self):
+        """测试新增、删除和变化"""
+        tracker = DeltaTracker()
+        tracker.update(frame([("000001", 10.0), ("000002", 20.0), ("000003", float("nan"))]))
+
+        delta = tracker.update(frame([("000001", 10.0), ("000002", 21.0), ("000003", float("nan")), ("000004", 5.0)]))
+
+        assert [r["代码"] for r in delta.inserted] == ["000004"]
+        assert [r["代码"] for r in delta.changed] == ["000002"]
+        assert delta.changed[0]["最新价"] == 21.0
+        assert delta.deleted == []
+
+        delta = tracker.update(frame([("000002", 21.0)]))
+        assert sorted(r["代码"] for r in delta.deleted) == ["000001", "000003", "000004"]
+
+    def test_unchanged_is_empty(self):
+        """测试没有变化时为空"""
+        tracker = DeltaTracker()
+        tracker.update(frame([("000001", 10.0)]))
+        delta = tracker.update(frame([("000001", 10.0)]))
+
+        assert delta.empty
+        assert not delta
+
+
+class TestClientDelta:
+    """测试客户端增量查询"""
+
+    def test_search_delta_per_keyword(self):
+        """测试每个关键词独立保存快照"""
+        client = EMStockClient()
+        results = [frame([("000001", 10.0)]), frame([("000001", 11.0)]), frame([("000009", 1.0)])]
+        with patch.object(client, "search", side_effect=results):
+            assert len(client.search_delta("今日涨停").inserted) == 1
+            assert len(client.search_delta("今日涨停").changed) == 1
+            assert len(client.search_delta("涨停板首板").inserted) == 1
+
+    @patch("emxg.client.time.sleep")
+    def test_watch_skips_empty(self, mock_sleep):
+        """测试watch只产出有变化的结果"""
+        client = EMStockClient()
+        results = [frame([("000001", 10.0)]), frame([("000001", 10.0)]), frame([("000001", 12.0)])]
+        with patch.object(client, "search", side_effect=results):
+            watcher = client.watch("今日涨停", interval=1)
+            first = next(watcher)
+            second = next(watcher)
+
+        assert len(first.inserted) == 1
+        assert len(second.changed) == 1
+        assert mock_sleep.call_count == 2
@@ -0,0 +1,151 @@
+"""
+测试hexin-v令牌生成
+"""
+
+import base64
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from emxg import device_info
+from emxg.device_info import BUFFER_SIZE, TokenGenerator, TokenPool, encode_buffer, get_token, set_token_pool
+
+
+UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0"
+
+
+def reference_encode(buffer):
+    """逐字节异或编码的原始实现"""
+    key = TokenGenerator(UA).simple_hash(buffer)
+    dst = bytearray([3, key])
+    for byte_value in buffer:
+        dst.append(byte_value ^ (key & 255))
+        key = ~(key * 131) & 0xFFFFFFFF
+    return base64.urlsafe_b64encode(dst).decode()
+
+
+class TestTokenEngine:
+    """测试预编译格式打包和编码"""
+
+    def test_matches_reference(self):
+        """测试struct打包和掩码编码的结果与逐字节实现一致"""
+        device = TokenGenerator(UA).device
+        for _ in range(200):
+            device.update_behavior_data()
+            device.mouse_moves = random.randint(0, 0xFFFFFF)
+            buffer = device.to_bytes()
+
+            assert len(buffer) == BUFFER_SIZE == 43
+            assert list(buffer) == device.to_buffer()
+            assert encode_buffer(buffer) == reference_encode(device.to_buffer())
+
+    def test_user_agent_hash_cached(self):
+        """测试同一User-Agent的哈希只计算一次"""
+        device_info._str_hash.cache_clear()
+        TokenGenerator(UA)
+        TokenGenerator(UA)
+
+        assert device_info._str_hash.cache_info().hits == 1
+
+
+class TestTokenPool:
+    """测试后台令牌池"""
+
+    def test_pool_refills(self):
+        """测试后台线程预生成令牌，取出后继续补充"""
+        pool = TokenPool(UA, size=4)
+        try:
+            deadline = time.monotonic() + 2
+            while pool._queue.qsize() < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            tokens = [pool.get() for _ in range(10)]
+        finally:
+            pool.close()
+
+        assert len(set(tokens)) == 10
+        assert all(len(base64.urlsafe_b64decode(t)) == BUFFER_SIZE + 2 for t in tokens)
+
+    def test_stale_tokens_dropped(self):
+        """测试丢弃超过max_age的令牌"""
+        pool = TokenPool(UA, size=2, max_age=0)
+        try:
+            pool._queue.queue.clear()
+            pool._queue.queue.append((time.monotonic() - 1, "stale"))
+            assert pool.get() != "stale"
+        finally:
+            pool.close()
+
+    def test_get_token_uses_pool(self):
+        """测试开启令牌池后get_token从池中取出，关闭后停止后台线程"""
+        set_token_pool(size=2)
+        try:
+            assert get_token(UA)
+            pool = device_info._token_pools[UA]
+        finally:
+            set_token_pool(0)
+
+        assert not pool._thread.is_alive()
+        assert device_info._token_pools == {}
+
+
+def decode_token(token):
+    """解码令牌，返回(编码密钥, 设备信息缓冲区)"""
+    raw = base64.urlsafe_b64decode(token)
+    key = raw[1]
+    buffer = (int.from_bytes(raw[2:], "big") ^ device_info._xor_mask(key)).to_bytes(BUFFER_SIZE, "big")
+    return key, buffer
+
+
+class TestConcurrency:
+    """测试多线程和多进程下的令牌生成"""
+
+    def test_shared_generator_threads(self):
+        """测试多个线程共用生成器时计数器连续且不重复，每个令牌对应一次完整的更新"""
+        generator = TokenGenerator(UA)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            tokens = list(executor.map(lambda _: generator.update(), range(2000)))
+
+        counters = []
+        for token in tokens:
+            key, buffer = decode_token(token)
+            assert key == generator.simple_hash(buffer)
+            counters.append(int.from_bytes(buffer[40:42], "big"))
+        assert sorted(counters) == list(range(1, 2001))
+
+    def test_get_token_generator_single_instance(self):
+        """测试多个线程同时获取生成器得到同一实例"""
+        device_info._cached_token_generator.cache_clear()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            generators = set(executor.map(lambda _: id(device_info.get_token_generator(UA)), range(64)))
+
+        assert len(generators) == 1
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="需要os.fork")
+    def test_reinit_after_fork(self):
+        """测试子进程重新创建生成器和令牌池，不沿用父进程的设备ID"""
+        parent = device_info.get_token_generator(UA)
+        parent.update()
+        set_token_pool(size=2)
+        try:
+            get_token(UA)
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                ok = (device_info._token_pools == {}
+                      and device_info.get_token_generator(UA) is not parent
+                      and device_info.get_token_generator(UA).device.counter == 0
+                      and bool(get_token(UA)))
+                os.write(write_fd, b"1" if ok else b"0")
+                os._exit(0)
+            os.close(write_fd)
+            result = os.read(read_fd, 1)
+            os.close(read_fd)
+            os.waitpid(pid, 0)
+        finally:
+            set_token_pool(0)
+
+        assert result == b"1"
+        assert device_info.get_token_generator(UA) is parent
@@ -0,0 +1,95 @@
+"""
+测试结果导出
+"""
+
+import csv
+
+import pytest
+
+from emxg import EMStockClient
+from emxg.data_adapter import BACKEND, DataProcessor
+from emxg.export import export_frame, export_pages
+from tests.test_client import FakeSession, em_page
+
+
+COLUMNS = [
+    {"key": "CODE", "title": "代码", "dataType": "String"},
+    {"key": "PRICE", "title": "最新价", "dataType": "Double"},
+]
+
+
+def make_pages():
+    """构造三页已转换的数据，第二页含无法解析的数值"""
+    dp = DataProcessor()
+    return [
+        dp.process_data([{"CODE": "000001", "PRICE": "1.5"}, {"CODE": "000002", "PRICE": "2.5"}], COLUMNS),
+        dp.process_data([{"CODE": "000003", "PRICE": "-"}], COLUMNS),
+        dp.process_data([{"CODE": "000004", "PRICE": None}], COLUMNS),
+    ]
+
+
+class TestExportPages:
+    """测试逐页导出"""
+
+    def test_csv(self, tmp_path):
+        """测试逐页写出CSV，缺失值为空字符串"""
+        path = tmp_path / "stocks.csv"
+        count = export_pages(iter(make_pages()), str(path))
+
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        assert count == 4
+        assert rows[:3] == [["代码", "最新价"], ["000001", "1.5"], ["000002", "2.5"]]
+        # pyarrow/polars后端中无法解析的数值为空值
+        assert rows[3] == ["000003", "-" if BACKEND in ("pandas", "python") else ""]
+        assert rows[4] == ["000004", ""]
+
+    def test_excel(self, tmp_path):
+        """测试使用只写模式写出Excel"""
+        openpyxl = pytest.importorskip("openpyxl")
+        path = tmp_path / "stocks.xlsx"
+        assert export_pages(make_pages(), str(path)) == 4
+
+        rows = list(openpyxl.load_workbook(path).active.values)
+        assert rows[0] == ("代码", "最新价")
+        assert rows[1] == ("000001", 1.5)
+        assert rows[4] == ("000004", None)
+
+    @pytest.mark.parametrize("name", ["stocks.parquet", "stocks.feather"])
+    def test_arrow_formats(self, tmp_path, name):
+        """测试写出Parquet和Feather，后续页面转换为首页的列类型"""
+        pytest.importorskip("pyarrow")
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+
+        path = tmp_path / name
+        assert export_pages(make_pages(), str(path)) == 4
+
+        table = pq.read_table(path) if name.endswith(".parquet") else feather.read_table(path)
+        assert table.column("代码").to_pylist() == ["000001", "000002", "000003", "000004"]
+        assert table.column("最新价").to_pylist() == [1.5, 2.5, None, None]
+
+    def test_from_iter_pages(self, tmp_path):
+        """测试直接导出客户端逐页获取的结果"""
+        client = EMStockClient()
+        client.session = FakeSession([em_page(["000001", "000002"], total=3), em_page(["000003"], total=3)])
+        path = tmp_path / "stocks.csv"
+
+        assert export_pages(client.iter_pages("测试关键词", page_size=2), str(path)) == 3
+        assert not (tmp_path / "stocks.csv.tmp").exists()
+
+    def test_failure_keeps_target(self, tmp_path):
+        """测试写出失败时不产生不完整的文件"""
+        def pages():
+            yield make_pages()[0]
+            raise RuntimeError("网络错误")
+
+        path = tmp_path / "stocks.csv"
+        with pytest.raises(RuntimeError):
+            export_pages(pages(), str(path))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_unknown_format(self, tmp_path):
+        """测试不支持的格式"""
+        with pytest.raises(ValueError):
+            export_frame(make_pages()[0], str(tmp_path / "stocks.txt"))
@@ -0,0 +1,52 @@
+"""
+测试JSON解码
+"""
+
+import json
+
+import pytest
+
+from emxg import set_json_decoder
+from emxg.fastjson import get_json_decoder, loads
+
+
+class TestLoads:
+    """测试JSON解码"""
+
+    def test_bytes_and_str(self):
+        """测试直接解析字节和字符串"""
+        payload = {"代码": "000001", "涨跌幅": 10.5, "列表": [1, None, True]}
+        text = json.dumps(payload, ensure_ascii=False)
+
+        assert loads(text.encode()) == payload
+        assert loads(text) == payload
+
+    def test_fallback_to_json(self):
+        """测试快速解码器不支持的写法回退到标准库json"""
+        value = loads(b'{"a": NaN, "b": 123456789012345678901234567890}')
+
+        assert value["a"] != value["a"]
+        assert value["b"] == 123456789012345678901234567890
+
+    def test_invalid(self):
+        """测试无效的JSON抛出ValueError"""
+        with pytest.raises(ValueError):
+            loads(b"<html>")
+
+    def test_set_json_decoder(self):
+        """测试设置自定义解码器并恢复自动选择"""
+        calls = []
+
+        def decoder(data):
+            calls.append(data)
+            return json.loads(data)
+
+        default = get_json_decoder()
+        set_json_decoder(decoder)
+        try:
+            assert loads(b"[1]") == [1]
+            assert calls == [b"[1]"]
+        finally:
+            set_json_decoder(None)
+
+        assert get_json_decoder() == default
@@ -0,0 +1,66 @@
+"""
+测试分页请求计划
+"""
+
+import pytest
+
+from emxg import EMStockClient
+from emxg.planner import PagePlan, plan_pages
+from emxg.wencai_client import _search_kwargs
+from tests.test_client import FakeSession, em_page
+
+
+class TestPlanPages:
+    """测试plan_pages"""
+
+    @pytest.mark.parametrize("max_count, max_page, page_size, page_count", [
+        (None, None, 50, None),
+        (None, 3, 50, 3),
+        (5, None, 5, 1),
+        (50, None, 50, 1),
+        (120, None, 40, 3),
+        (130, None, 44, 3),
+        (500, 2, 50, 2),
+    ])
+    def test_plan(self, max_count, max_page, page_size, page_count):
+        """测试每页数量和页数"""
+        plan = plan_pages(max_count, max_page, 50)
+        assert plan.page_size == page_size
+        assert plan.page_count == page_count
+        assert plan.limit == max_count
+
+    def test_pages_for_total(self):
+        """测试已知总数时的页数"""
+        assert PagePlan(40, 3, 120).pages_for_total(1000) == 3
+        assert PagePlan(40, 3, 120).pages_for_total(50) == 2
+        assert PagePlan(50).pages_for_total(101) == 3
+
+    def test_remaining(self):
+        """测试剩余条数"""
+        assert PagePlan(40, 3, 120).remaining(100) == 20
+        assert PagePlan(40, 3, 120).remaining(130) == 0
+        assert PagePlan(50).remaining(100) is None
+
+    @pytest.mark.parametrize("max_count, max_page, expected", [
+        (None, None, {"loop": True, "limit": None, "perpage": 100}),
+        (None, 3, {"loop": 3, "limit": None, "perpage": 100}),
+        (5, None, {"loop": False, "limit": 5, "perpage": 5}),
+        (250, None, {"loop": 3, "limit": 250, "perpage": 84}),
+    ])
+    def test_wencai_search_kwargs(self, max_count, max_page, expected):
+        """测试i问财查询参数"""
+        assert _search_kwargs(max_count, max_page) == expected
+
+
+class TestEMPlan:
+    """测试东方财富客户端按计划请求"""
+
+    def test_small_limit_uses_small_page(self):
+        """测试小数量查询只请求需要的条数"""
+        client = EMStockClient()
+        client.session = FakeSession([em_page(["000001", "000002", "000003", "000004", "000005"], total=100)])
+
+        result = client.search("测试关键词", max_count=5)
+
+        assert len(result) == 5
+        assert [r["pageSize"] for r in client.session.requests] == [5]
@@ -0,0 +1,69 @@
+"""
+测试请求限流
+"""
+
+import time
+
+import pytest
+
+from unittest.mock import Mock
+
+from emxg import EMStockClient, RateLimiter, FileRateLimiter, set_rate_limiter
+from emxg.ratelimit import get_rate_limiter
+
+
+class TestRateLimiter:
+    """测试令牌桶限流器"""
+
+    def test_burst_then_wait(self):
+        """测试突发额度用完后按速率排队"""
+        limiter = RateLimiter(rate=10, burst=2)
+
+        assert limiter.reserve() == 0
+        assert limiter.reserve() == 0
+        assert limiter.reserve() == pytest.approx(0.1, abs=0.02)
+        assert limiter.reserve() == pytest.approx(0.2, abs=0.02)
+
+    def test_acquire_blocks(self):
+        """测试acquire阻塞等待"""
+        limiter = RateLimiter(rate=20, burst=1)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+
+        assert time.monotonic() - start >= 0.09
+
+    def test_file_limiter_shared_state(self, tmp_path):
+        """测试使用同一文件的限流器共享额度"""
+        path = str(tmp_path / "emxg.bucket")
+        first = FileRateLimiter(path, rate=10, burst=1)
+        second = FileRateLimiter(path, rate=10, burst=1)
+
+        assert first.reserve() == 0
+        assert second.reserve() == pytest.approx(0.1, abs=0.02)
+
+    def test_invalid_rate(self):
+        """测试无效速率"""
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+
+
+class TestClientThrottle:
+    """测试客户端在请求前限流"""
+
+    def test_fetch_page_consults_limiter(self):
+        """测试每次请求前获取令牌"""
+        limiter = RateLimiter(rate=0.001, burst=5)
+        set_rate_limiter("emxg", limiter)
+        try:
+            client = EMStockClient()
+            client.session = Mock()
+            client.session.post.side_effect = RuntimeError("网络错误")
+            for _ in range(3):
+                with pytest.raises(RuntimeError):
+                    client._fetch_page("今日涨停", 50, 1, "")
+        finally:
+            set_rate_limiter("emxg", None)
+
+        assert limiter._tokens == pytest.approx(2, abs=0.1)
+        assert get_rate_limiter("emxg") is None
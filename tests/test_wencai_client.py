@@ -0,0 +1,388 @@
+"""
+测试WencaiStockClient类
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+
+from unittest.mock import Mock, PropertyMock, patch
+
+from emxg import WencaiStockClient, AsyncWencaiStockClient
+from emxg.data_adapter import concat
+from tests.test_client import column
+
+
+COLUMNS = [
+    {"key": "code", "index_name": "股票代码", "type": "STR"},
+    {"key": "最新涨跌幅", "index_name": "涨跌幅", "type": "DOUBLE", "unit": "%"},
+]
+
+
+def wencai_page(codes):
+    """构造一页i问财getDataList接口返回数据"""
+    datas = [{"code": code, "最新涨跌幅": "10.5"} for code in codes]
+    return {"answer": {"components": [{"data": {"datas": datas, "columns": COLUMNS}}]}}
+
+
+class FakeSession:
+    """按page返回预设页面的requests会话"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def post(self, url, data=None, **kwargs):
+        self.requests.append(data)
+        response = Mock()
+        response.content = json.dumps(self.pages[data["page"] - 1]).encode()
+        return response
+
+
+def make_client(pages):
+    client = WencaiStockClient()
+    client.session = FakeSession(pages)
+    return client
+
+
+class FakeAsyncResponse:
+    """模拟aiohttp响应"""
+
+    def __init__(self, payload, status=200):
+        self.payload = payload
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            import aiohttp
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    async def read(self):
+        return json.dumps(self.payload).encode()
+
+
+class FakeAsyncSession:
+    """get_robot_data返回表格条件，getDataList按page返回预设页面的aiohttp会话"""
+
+    def __init__(self, pages, robot, failures=0):
+        self.pages = pages
+        self.robot = robot
+        self.failures = failures
+        self.requests = []
+
+    def post(self, url, json=None, data=None, headers=None):
+        self.requests.append((url, json or data, headers))
+        if "get-robot-data" in url:
+            return FakeAsyncResponse(self.robot)
+        if self.failures:
+            self.failures -= 1
+            return FakeAsyncResponse({}, status=503)
+        return FakeAsyncResponse(self.pages[data["page"] - 1])
+
+
+def robot_body(row_count):
+    """构造get_robot_data接口返回的表格结果"""
+    component = {
+        "show_type": "xuangu_tableV1",
+        "cid": 1,
+        "puuid": 2,
+        "data": {"meta": {"extra": {"condition": "c", "row_count": row_count}}},
+        "config": {"other_info": {"footer_info": {"url": "/path?perpage=2&query_type=stock"}}},
+    }
+    return {"data": {"answer": [{"txt": [{"content": json.dumps({"components": [component]})}]}]}}
+
+
+PAGES = [wencai_page(["000001", "000002"]), wencai_page(["000003", "000004"]), wencai_page(["000005"])]
+
+
+class TestLoopPage:
+    """测试分页获取"""
+
+    @pytest.mark.parametrize("pipeline", [False, True])
+    def test_loop_page(self, pipeline):
+        """测试按页码顺序获取全部分页并转换"""
+        client = make_client(PAGES)
+        result = client.loop_page(True, 5, {"condition": "c"}, perpage=2, pipeline=pipeline)
+
+        assert column(result, "股票代码") == ["000001", "000002", "000003", "000004", "000005"]
+        assert column(result, "涨跌幅") == [0.105] * 5
+        assert [r["page"] for r in client.session.requests] == [1, 2, 3]
+
+    def test_concat_once(self):
+        """测试各页收集后只合并一次"""
+        client = make_client(PAGES)
+        with patch("emxg.wencai_client.concat", wraps=concat) as merge:
+            result = client.loop_page(True, 5, {}, perpage=2)
+
+        assert len(result) == 5
+        assert merge.call_count == 1
+        assert len(merge.call_args[0][0]) == 3
+
+    @pytest.mark.parametrize("pipeline", [False, True])
+    def test_iter_loop_page(self, pipeline):
+        """测试逐页产出转换后的数据"""
+        client = make_client(PAGES)
+        pages = list(client.iter_loop_page(True, 5, {}, perpage=2, pipeline=pipeline))
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert column(pages[2], "股票代码") == ["000005"]
+
+    def test_iter_pages(self):
+        """测试按查询逐页产出，非表格结果不产出数据"""
+        client = make_client(PAGES)
+        robot = {"data": {"condition": "c"}, "row_count": 5, "url_params": {}}
+        with patch.object(client, "get_robot_data", return_value=robot):
+            pages = list(client.iter_pages(query="测试", loop=2, perpage=2))
+        with patch.object(client, "get_robot_data", return_value={"data": {"txt": "文本"}}):
+            assert list(client.iter_pages(query="测试")) == []
+
+        assert [len(page) for page in pages] == [2, 2]
+        assert [r["page"] for r in client.session.requests] == [1, 2]
+
+    def test_pipeline_page_limit(self):
+        """测试流水线模式只获取loop指定的页数"""
+        client = make_client(PAGES)
+        result = client.loop_page(2, 5, {}, perpage=2, pipeline=True)
+
+        assert len(result) == 4
+        assert [r["page"] for r in client.session.requests] == [1, 2]
+
+
+class FlakySession(FakeSession):
+    """指定页码先返回若干次空数据的requests会话"""
+
+    def __init__(self, pages, failures):
+        super().__init__(pages)
+        self.failures = dict(failures)
+
+    def post(self, url, data=None, **kwargs):
+        page = data["page"]
+        if self.failures.get(page):
+            self.failures[page] -= 1
+            self.requests.append(data)
+            response = Mock()
+            response.content = json.dumps(wencai_page([])).encode()
+            return response
+        return super().post(url, data=data, **kwargs)
+
+
+class TestParallelLoopPage:
+    """测试并行分页"""
+
+    def test_parallel_in_order(self):
+        """测试并行获取全部分页并按页码顺序合并"""
+        client = make_client(PAGES)
+        result = client.loop_page(True, 5, {}, perpage=2, workers=3)
+
+        assert column(result, "股票代码") == ["000001", "000002", "000003", "000004", "000005"]
+        assert sorted(r["page"] for r in client.session.requests) == [1, 2, 3]
+
+    def test_page_retries(self):
+        """测试失败页在重试次数内按指数退避重新获取"""
+        client = WencaiStockClient(page_backoff=0.01)
+        client.session = FlakySession(PAGES, {2: 2})
+        errors = {}
+        started = time.monotonic()
+        result = client.loop_page(True, 5, {}, perpage=2, workers=3, page_retries=2, errors=errors)
+
+        # 每次重试前至少等待 4 * page_backoff 秒
+        assert time.monotonic() - started >= 0.08
+        assert len(result) == 5
+        assert errors == {}
+        assert [r["page"] for r in client.session.requests].count(2) == 3
+
+    def test_page_retries_bound_attempts(self):
+        """测试并行模式下每页的请求次数只由page_retries决定，不叠加post自带的重试"""
+        import requests
+
+        class DeadPageSession(FakeSession):
+            def post(self, url, data=None, **kwargs):
+                if data["page"] == 2:
+                    self.requests.append(data)
+                    raise requests.ConnectionError("连接失败")
+                return super().post(url, data=data, **kwargs)
+
+        client = WencaiStockClient(page_backoff=0)
+        client.session = DeadPageSession(PAGES)
+        errors = {}
+        started = time.monotonic()
+        result = client.loop_page(True, 5, {}, perpage=2, workers=3, page_retries=2, errors=errors)
+
+        assert time.monotonic() - started < 2
+        assert [r["page"] for r in client.session.requests].count(2) == 3
+        assert list(errors) == [2]
+        assert column(result, "股票代码") == ["000001", "000002", "000005"]
+
+    def test_failed_pages_reported(self, tmp_path):
+        """测试超过重试次数的页记录到errors，其余页照常合并且不写入缓存"""
+        from emxg import ResponseCache
+
+        client = WencaiStockClient(cache=ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60), page_backoff=0)
+        client.session = FlakySession(PAGES, {2: 5})
+        robot = {"data": {"condition": "c"}, "row_count": 5, "url_params": {}}
+        page_errors = {}
+        with patch.object(client, "get_robot_data", return_value=robot), \
+                patch.object(client.cache, "set") as cache_set:
+            result = client.search(query="测试", loop=True, perpage=2, workers=2, page_retries=1,
+                                   page_errors=page_errors)
+
+        assert column(result, "股票代码") == ["000001", "000002", "000005"]
+        assert list(page_errors) == [2]
+        assert "empty" in page_errors[2]
+        cache_set.assert_not_called()
+
+
+class TestRobotCache:
+    """测试问句解析结果缓存"""
+
+    ROBOT = {"data": {"condition": "c", "comp_id": 1, "uuid": 2}, "row_count": 5, "url_params": {}}
+
+    def test_repeat_query_skips_robot_data(self, tmp_path):
+        """测试重复查询直接请求分页数据，不同问句分别解析"""
+        from emxg import ResponseCache
+
+        client = make_client(PAGES)
+        client.robot_cache = ResponseCache(str(tmp_path / "robot.sqlite"), ttl=600)
+        with patch.object(client, "get_robot_data", return_value=self.ROBOT) as robot:
+            first = client._search(loop=True, query="测试", perpage=2)
+            second = client._search(loop=True, query="测试", perpage=2)
+            client._search(query="其他")
+
+        assert len(first) == len(second) == 5
+        assert robot.call_count == 2
+        assert client.resolve(query="测试") == self.ROBOT
+
+    def test_stale_condition_refreshed(self, tmp_path):
+        """测试缓存的条件失效时重新解析问句并更新缓存"""
+        from emxg import ResponseCache
+
+        client = make_client(PAGES)
+        client.robot_cache = ResponseCache(str(tmp_path / "robot.sqlite"), ttl=600)
+        client._store_robot_data({"query": "测试"}, {**self.ROBOT, "row_count": 8})
+        with patch.object(client, "get_robot_data", return_value=self.ROBOT) as robot:
+            result = client._search(loop=True, query="测试", perpage=2)
+
+        assert len(result) == 5
+        assert robot.call_count == 1
+        assert client.resolve(query="测试")["row_count"] == 5
+
+    def test_async_client_uses_cache(self, tmp_path):
+        """测试异步客户端共用缓存的解析结果"""
+        pytest.importorskip("aiohttp")
+        from emxg import ResponseCache
+
+        cache = ResponseCache(str(tmp_path / "robot.sqlite"), ttl=600)
+        for robot_requests in (1, 0):
+            session = FakeAsyncSession(PAGES, robot_body(5))
+            client = AsyncWencaiStockClient(session=session, robot_cache=cache)
+            result = asyncio.run(client.search(query="测试", loop=True, perpage=2))
+            assert len(result) == 5
+            assert sum("get-robot-data" in url for url, _, _ in session.requests) == robot_requests
+
+
+class TestConvert:
+    """测试get_robot_data结果解析"""
+
+    def _response(self):
+        component = {
+            "show_type": "xuangu_tableV1",
+            "cid": 1,
+            "puuid": 2,
+            "data": {"meta": {"extra": {"condition": "c", "row_count": 5}}},
+            "config": {"other_info": {"footer_info": {"url": "/path?perpage=100&query_type=stock"}}},
+        }
+        content = json.dumps({"components": [component]})
+        body = {"data": {"answer": [{"txt": [{"content": content}]}]}}
+        response = Mock()
+        response.content = json.dumps(body).encode()
+        text = PropertyMock(return_value=json.dumps(body))
+        type(response).text = text
+        return response, text
+
+    def test_convert(self):
+        """测试解析条件和分页参数，未开启DEBUG日志时不解码响应文本"""
+        response, text = self._response()
+        logging.getLogger("emxg").setLevel(logging.INFO)
+        try:
+            result = WencaiStockClient().convert(response)
+        finally:
+            logging.getLogger("emxg").setLevel(logging.NOTSET)
+
+        assert result["data"] == {"condition": "c", "comp_id": 1, "uuid": 2}
+        assert result["row_count"] == 5
+        assert result["url_params"] == {"perpage": "100", "query_type": "stock"}
+        text.assert_not_called()
+
+
+class TestAsyncWencaiStockClient:
+    """测试AsyncWencaiStockClient类"""
+
+    def test_search_pages_concurrently(self):
+        """测试解析条件后并发获取全部分页并按页码合并，每个请求带hexin-v请求头"""
+        pytest.importorskip("aiohttp")
+        session = FakeAsyncSession(PAGES, robot_body(5))
+        client = AsyncWencaiStockClient(session=session, concurrency=2)
+
+        result = asyncio.run(client.search(query="测试", loop=True, perpage=2))
+
+        assert column(result, "股票代码") == ["000001", "000002", "000003", "000004", "000005"]
+        assert sorted(data["page"] for _, data, _ in session.requests[1:]) == [1, 2, 3]
+        assert all(data["condition"] == "c" for _, data, _ in session.requests[1:])
+        assert all("hexin-v" in headers for _, _, headers in session.requests)
+
+    def test_retry_with_backoff(self):
+        """测试HTTP错误时重试，超过次数后抛出异常"""
+        pytest.importorskip("aiohttp")
+        import aiohttp
+
+        session = FakeAsyncSession(PAGES, robot_body(5), failures=2)
+        client = AsyncWencaiStockClient(session=session, retries=3, backoff=0)
+        result = asyncio.run(client.search(query="测试", loop=2, limit=3, perpage=2))
+        assert column(result, "股票代码") == ["000001", "000002", "000003"]
+
+        session = FakeAsyncSession(PAGES, robot_body(5), failures=3)
+        client = AsyncWencaiStockClient(session=session, retries=3, backoff=0)
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(client.search(query="测试"))
+
+    def test_non_table_result(self):
+        """测试非表格结果返回multi_show_type_handler的解析结果，no_detail时返回None"""
+        pytest.importorskip("aiohttp")
+        body = {"data": {"answer": [{"txt": [{"content": {"components": [
+            {"show_type": "txt1", "data": {"content": "文本"}}]}}]}]}}
+        session = FakeAsyncSession(PAGES, body)
+        client = AsyncWencaiStockClient(session=session)
+
+        result = asyncio.run(client.search(query="测试"))
+        assert result == WencaiStockClient()._parse_robot_data(json.dumps(body).encode())["data"]
+        assert len(session.requests) == 1
+        assert asyncio.run(client.search(query="测试", no_detail=True)) is None
+
+    def test_no_sync_only_methods(self):
+        """测试异步客户端不暴露依赖同步会话的方法"""
+        client = AsyncWencaiStockClient(session=FakeAsyncSession(PAGES, robot_body(5)))
+
+        assert not isinstance(client, WencaiStockClient)
+        for name in ("iter_pages", "iter_loop_page", "_parallel_pages", "post", "convert"):
+            assert not hasattr(client, name)
+
+    def test_asearch_wencai_logs_error(self, caplog):
+        """测试异步便捷函数失败时记录异常信息并返回None"""
+        from emxg import asearch_wencai
+
+        async def run():
+            with patch.object(AsyncWencaiStockClient, "search", side_effect=RuntimeError("网络错误")):
+                return await asearch_wencai("测试")
+
+        with caplog.at_level("ERROR", logger="emxg"):
+            assert asyncio.run(run()) is None
+        assert "获取i问财数据失败: 网络错误" in caplog.text